@@ -1,29 +1,63 @@
-from typing import Callable, Awaitable, Dict, Any, List, Optional
+from typing import Callable, Awaitable, Dict, Any, List, Optional, Set
 import logging
-from base import LLMHandler, ConversationContext, parse_version, is_compliant_version
+import asyncio
+import os
+from base import LLMHandler, ConversationContext, PromptBuilder, parse_version, is_compliant_version, extract_package_version
+from policy import get_policy
+from log_pipeline import log_event
+from scheduler import scheduler, PRIORITY_NORMAL
 from tools import OperatorAgentTool, DiagnosticTool, TroubleshootingTool
 
 logger = logging.getLogger(__name__)
 
+API_KEY = os.environ.get("NVIDIA_API_KEY", "enter your key")
+
 class ConversationalAgent:
     def __init__(self, message_callback: Callable[[str], Awaitable[None]]):
-        api_key = "enter your key"
-        
-        self.llm_handler = LLMHandler(api_key)
+        self.llm_handler = LLMHandler(API_KEY)
         self.message_callback = message_callback
         self.operator_tool = OperatorAgentTool(message_callback)
         self.diagnostic_tool = DiagnosticTool(self.operator_tool, self.llm_handler)
         self.troubleshooting_tool = TroubleshootingTool(self.llm_handler)
         
         self.context = ConversationContext()
-        self.system_prompt = self.llm_handler.get_system_prompt("Conversational")
+        self.prompt_builder = PromptBuilder("Conversational")
+        # Held by each user turn; background results are applied between turns
+        self._turn_lock = asyncio.Lock()
+        self._reports: Set[asyncio.Task] = set()
 
     async def send_message(self, message: str):
         await self.message_callback(message)
 
+    def _defer(self, job_name: str, factory, priority: int = PRIORITY_NORMAL):
+        # Keyed per agent so repeated requests in one session collapse into one pending job.
+        # Jobs must not touch self.context directly; they hand their results to _report.
+        return scheduler.submit(f"{id(self)}:{job_name}", factory, priority)
+
+    def _report(self, apply: Callable[[], None], message: str):
+        # Applied from a separate task so no scheduler worker waits for a slow turn
+        async def report():
+            async with self._turn_lock:
+                apply()
+                await self.send_message(message)
+
+        task = asyncio.create_task(report())
+        self._reports.add(task)
+        task.add_done_callback(self._reports.discard)
+
+    def cancel_background_jobs(self):
+        """Drop queued, running and unreported background work; called when the session ends"""
+        scheduler.cancel(f"{id(self)}:")
+        for task in list(self._reports):
+            task.cancel()
+
     async def get_response(self, user_message: str):
-        logger.info(f"Processing user message: {user_message}")
-        
+        log_event(logger, logging.INFO, "user_message", "Processing user message", body=user_message)
+
+        async with self._turn_lock:
+            await self._respond(user_message)
+
+    async def _respond(self, user_message: str):
         try:
             # Store user message in context
             self.context.add_message("user", user_message)
@@ -69,7 +103,7 @@ class ConversationalAgent:
 
                 # Update system status
                 self.context.system_context.system_checked = True
-                self.context.system_context.is_compliant = is_compliant_version(version)
+                self.context.system_context.is_compliant = self._evaluate_compliance(version)
 
                 if self.context.system_context.is_compliant:
                     await self.send_message(
@@ -88,6 +122,18 @@ class ConversationalAgent:
                 "Let me try to resolve this."
             )
 
+    def _evaluate_compliance(self, version: str) -> bool:
+        # The per-turn gate is Python-only: package rules need a full inventory
+        # and have no remediation path here, so they apply to fleet scans
+        if is_compliant_version(version):
+            return True
+        log_event(
+            logger, logging.INFO, "compliance_violation",
+            f"Python {version} does not satisfy requirement {get_policy().python_specifier}",
+            rule="python", subject="python"
+        )
+        return False
+
     async def _process_user_query(self, user_message: str):
         # Check if it's a software installation request
         if any(keyword in user_message.lower() for keyword in ["install", "update", "upgrade"]):
@@ -100,16 +146,11 @@ class ConversationalAgent:
             await self._handle_system_issue(user_message)
             return
 
-        # General query handling
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": user_message}
-        ]
-        
-        # Add relevant context
-        messages.extend(self.context.get_recent_context())
+        # General query handling; the user message was already added to the
+        # context in get_response, so it is the last entry of the history
+        messages = self.prompt_builder.build(context=self.context)
         
-        response = self.llm_handler.invoke(messages, "Conversational Agent")
+        response = await self.llm_handler.ainvoke(messages, "Conversational Agent")
         await self.send_message(response)
 
     async def _handle_installation_request(self, user_message: str):
@@ -131,19 +172,38 @@ class ConversationalAgent:
             )
 
             if operator_response.is_complete:
-                # Verify installation
-                troubleshooting_response = await self.troubleshooting_tool.analyze(
-                    {"package": diagnostic_response.data['package'], "status": "installed"},
-                    self.context
-                )
-                await self.send_message(troubleshooting_response.message)
+                package_name = diagnostic_response.data['package']
 
-                # Confirm to user
+                # Verification runs after this turn and reports its result separately
                 await self.send_message(
-                    f"[Conversational Agent]: The installation is complete. "
-                    f"Is there anything else you need assistance with?"
+                    f"[Conversational Agent]: The installation of {package_name} has been submitted. "
+                    f"I'll verify it and let you know. Is there anything else you need assistance with?"
+                )
+                self._defer(
+                    f"verify_install:{package_name}",
+                    lambda: self._verify_installation(package_name)
                 )
 
+    async def _verify_installation(self, package_name: str):
+        # Runs without the turn lock; the operator call only reads the context
+        check_response = await self.operator_tool.execute(f"pip list | grep {package_name}", self.context)
+        output = check_response.final_result or ""
+        result = output.lower()
+        installed = package_name.lower() in result and not any(
+            x in result for x in ["not installed", "not found", "error"]
+        )
+        version = extract_package_version(output, package_name) if installed else None
+        troubleshooting_response = await self.troubleshooting_tool.analyze(
+            {"package": package_name, "status": "installed" if installed else "unknown"},
+            self.context
+        )
+
+        def record():
+            if version:
+                self.context.system_context.installed_packages[package_name.lower()] = version
+
+        self._report(record, troubleshooting_response.message)
+
     async def _handle_system_issue(self, user_message: str):
         await self.send_message(
             "[Conversational Agent]: I'll help diagnose and resolve this issue. "
@@ -201,7 +261,7 @@ class ConversationalAgent:
         )
 
         if operator_response.is_complete:
-            # Verify resolution
+            # Verify resolution inline: compliance gates every turn, so it is not deferrable
             verification_response = await self.operator_tool.execute(
                 "python --version",
                 self.context
@@ -209,7 +269,8 @@ class ConversationalAgent:
             
             if verification_response.is_complete:
                 version = parse_version(verification_response.final_result)
-                if is_compliant_version(version):
+                self.context.system_context.python_version = version
+                if self._evaluate_compliance(version):
                     self.context.system_context.is_compliant = True
                     await self.send_message(
                         "[Conversational Agent]: System compliance has been restored. "
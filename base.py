@@ -1,14 +1,19 @@
-from langchain_nvidia_ai_endpoints import ChatNVIDIA
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Pattern, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 import logging
+import asyncio
 import json
+import sys
 import re
 from datetime import datetime
+from policy import get_policy
+from batching import get_batcher
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_VERSION_PATTERN = re.compile(r'\d+\.\d+\.\d+')
+
 @dataclass
 class SystemContext:
     python_version: Optional[str] = None
@@ -37,12 +42,21 @@ class OperatorResponse:
     command_type: Optional[str] = None
     status: str = "success"
 
+# Rough per-message overhead (dict, timestamp, role/agent strings) for memory accounting
+_MESSAGE_OVERHEAD_BYTES = 400
+
+def _message_size(message: Dict[str, Any]) -> int:
+    return _MESSAGE_OVERHEAD_BYTES + len(message["content"])
+
 class ConversationContext:
     def __init__(self):
         self.messages: List[Dict[str, Any]] = []
         self.system_context = SystemContext()
         self.last_agent: Optional[str] = None
         self.current_issue: Optional[str] = None
+        self.approx_bytes = 0
+        # LLM-ready {"role", "content"} views of self.messages, built once per message
+        self.llm_messages: List[Dict[str, str]] = []
 
     def add_message(self, role: str, content: str, agent: Optional[str] = None):
         message = {
@@ -52,14 +66,25 @@ class ConversationContext:
             "agent": agent
         }
         self.messages.append(message)
+        self.llm_messages.append({"role": role, "content": content})
+        self.approx_bytes += _message_size(message)
         if agent:
             self.last_agent = agent
 
+    def trim_history(self, max_bytes: int) -> int:
+        """Drop the oldest messages until the history fits in max_bytes; returns how many were dropped"""
+        dropped = 0
+        while self.approx_bytes > max_bytes and dropped < len(self.messages):
+            self.approx_bytes -= _message_size(self.messages[dropped])
+            dropped += 1
+        if dropped:
+            del self.messages[:dropped]
+            del self.llm_messages[:dropped]
+        return dropped
+
     def get_recent_context(self, limit: int = 5) -> List[Dict[str, str]]:
-        return [
-            {"role": msg["role"], "content": msg["content"]}
-            for msg in self.messages[-limit:]
-        ]
+        # Shares the message dicts; callers must not mutate them
+        return self.llm_messages[-limit:]
 
     def get_system_state(self) -> Dict[str, Any]:
         return {
@@ -71,7 +96,7 @@ class ConversationContext:
 
 def parse_version(version_str: str) -> str:
     try:
-        version_match = re.search(r'\d+\.\d+\.\d+', version_str)
+        version_match = _VERSION_PATTERN.search(version_str)
         if version_match:
             return version_match.group(0)
         return "0.0.0"
@@ -80,11 +105,7 @@ def parse_version(version_str: str) -> str:
         return "0.0.0"
 
 def is_compliant_version(version: str) -> bool:
-    try:
-        major, minor, _ = map(int, version.split('.'))
-        return (major == 3 and minor >= 10) or major > 3
-    except:
-        return False
+    return get_policy().check_python(version)
 
 def extract_package_version(output: str, package_name: str) -> Optional[str]:
     try:
@@ -96,40 +117,37 @@ def extract_package_version(output: str, package_name: str) -> Optional[str]:
         logger.error(f"Error extracting package version: {e}")
         return None
 
-class LLMHandler:
-    def __init__(self, api_key: str):
-        self.llm = ChatNVIDIA(
+@lru_cache(maxsize=None)
+def _agent_prefix_pattern(agent_prefix: str) -> Pattern:
+    return re.compile(f"\\[{re.escape(agent_prefix)}\\]:\\s*")
+
+# Shared ChatNVIDIA clients, one per API key
+_llm_clients: Dict[str, Any] = {}
+
+def get_llm_client(api_key: str):
+    """Create the ChatNVIDIA client once per key; the import is deferred because it takes seconds"""
+    client = _llm_clients.get(api_key)
+    if client is None:
+        from langchain_nvidia_ai_endpoints import ChatNVIDIA
+        client = _llm_clients.setdefault(api_key, ChatNVIDIA(
             model="meta/llama-3.3-70b-instruct",
             api_key=api_key,
             temperature=0.2,
             top_p=0.7,
             max_tokens=1024,
-        )
+        ))
+    return client
 
-    def invoke(self, messages: List[Dict[str, str]], agent_prefix: str) -> str:
-        try:
-            response = self.llm.invoke(messages)
-            content = response.content.strip()
-            
-            # Clean up the response
-            if content.startswith('"') and content.endswith('"'):
-                content = content[1:-1].strip()
-            
-            # Remove any existing agent prefix
-            prefix_pattern = f"\\[{agent_prefix}\\]:\\s*"
-            content = re.sub(prefix_pattern, "", content)
-            
-            # Format final message
-            return f"[{agent_prefix}]: {content}"
-            
-        except Exception as e:
-            logger.error(f"Error in LLM invocation: {e}")
-            return f"[{agent_prefix}]: Error processing request: {str(e)}"
+def warm_up_llm_client(api_key: str):
+    """Import and build the LLM client ahead of the first request (run off the event loop)"""
+    try:
+        get_llm_client(api_key)
+        logger.info("LLM client warmed up")
+    except Exception as e:
+        logger.error(f"Error warming up LLM client: {e}")
 
-    def get_system_prompt(self, agent_type: str) -> str:
-        """Get the appropriate system prompt for each agent type"""
-        prompts = {
-            "Conversational": """You are the Cognizant Workplace Companion, the primary interface for VDI system support.
+SYSTEM_PROMPTS: Dict[str, str] = {
+    "Conversational": """You are the Cognizant Workplace Companion, the primary interface for VDI system support.
 
 ROLE:
 - Direct communication with users
@@ -165,7 +183,7 @@ REMEMBER: You are part of a team of agents working together to solve user issues
 
 """,
 
-            "Diagnostic": """You are the Diagnostic Agent responsible for technical analysis and directing system operations.
+    "Diagnostic": """You are the Diagnostic Agent responsible for technical analysis and directing system operations.
 
 ROLE:
 - Analyze user issues
@@ -185,7 +203,7 @@ COMMANDS: Use exact commands for Operator Agent (examples):
 - For installation: "pip install <package_name>"
 - For version checks: "python --version" """,
 
-            "Troubleshooting": """You are the Troubleshooting Agent responsible for resolving technical issues.
+    "Troubleshooting": """You are the Troubleshooting Agent responsible for resolving technical issues.
 
 ROLE:
 - Analyze diagnostic results
@@ -200,5 +218,90 @@ RULES:
 4. Provide clear success/failure status
 5. Recommend next steps if needed
 """
-        }
-        return prompts.get(agent_type, "")
\ No newline at end of file
+}
+
+# Interned once per process so every agent shares the same prompt objects
+SYSTEM_PROMPTS = {agent_type: sys.intern(prompt) for agent_type, prompt in SYSTEM_PROMPTS.items()}
+
+@lru_cache(maxsize=None)
+def get_prompt_prefix(agent_type: str) -> Tuple[Dict[str, str], ...]:
+    """Shared system-message prefix for an agent type; the dicts must not be mutated"""
+    prompt = SYSTEM_PROMPTS.get(agent_type, "")
+    return ({"role": "system", "content": prompt},) if prompt else ()
+
+class PromptBuilder:
+    """Assembles LLM message lists as system prefix + recent history + new user tail.
+
+    The prefix and history dicts are shared across turns, so a turn only
+    allocates the outer list and its own user message. The ordering never
+    changes, which keeps the prefix byte-identical for upstream prompt caching.
+    """
+
+    def __init__(self, agent_type: str, history_limit: int = 5):
+        self.agent_type = agent_type
+        self.history_limit = history_limit
+        self.prefix = get_prompt_prefix(agent_type)
+
+    def build(
+        self,
+        user_content: Optional[str] = None,
+        context: Optional[ConversationContext] = None
+    ) -> List[Dict[str, str]]:
+        messages = list(self.prefix)
+        if context is not None and self.history_limit > 0:
+            messages.extend(context.get_recent_context(self.history_limit))
+        if user_content is not None:
+            messages.append({"role": "user", "content": user_content})
+        return messages
+
+class LLMHandler:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    @property
+    def llm(self):
+        return get_llm_client(self.api_key)
+
+    @property
+    def batcher(self):
+        return get_batcher(self.api_key, self.llm)
+
+    def invoke(self, messages: List[Dict[str, str]], agent_prefix: str) -> str:
+        try:
+            response = self.llm.invoke(messages)
+            return self._format_response(response.content, agent_prefix)
+            
+        except Exception as e:
+            logger.error(f"Error in LLM invocation: {e}")
+            return f"[{agent_prefix}]: Error processing request: {str(e)}"
+
+    async def ainvoke(self, messages: List[Dict[str, str]], agent_prefix: str) -> str:
+        """Non-blocking invoke; requests go through the shared micro-batcher when enabled"""
+        try:
+            # Build the client off the event loop if the background warm-up hasn't finished
+            if self.api_key not in _llm_clients:
+                await asyncio.to_thread(get_llm_client, self.api_key)
+
+            batcher = self.batcher
+            if batcher is not None:
+                response = await batcher.submit(messages)
+            else:
+                response = await self.llm.ainvoke(messages)
+            return self._format_response(response.content, agent_prefix)
+
+        except Exception as e:
+            logger.error(f"Error in LLM invocation: {e}")
+            return f"[{agent_prefix}]: Error processing request: {str(e)}"
+
+    def _format_response(self, content: str, agent_prefix: str) -> str:
+        content = content.strip()
+
+        # Clean up the response
+        if content.startswith('"') and content.endswith('"'):
+            content = content[1:-1].strip()
+        
+        # Remove any existing agent prefix
+        content = _agent_prefix_pattern(agent_prefix).sub("", content)
+        
+        # Format final message
+        return f"[{agent_prefix}]: {content}"
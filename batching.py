@@ -0,0 +1,120 @@
+from typing import Dict, Any, List, Optional, Tuple, Set
+from functools import lru_cache
+import logging
+import asyncio
+import os
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW_ENV = "LLM_BATCH_WINDOW_MS"
+BATCH_SIZE_ENV = "LLM_MAX_BATCH_SIZE"
+
+PendingRequest = Tuple[List[Dict[str, str]], asyncio.Future]
+
+class LLMBatcher:
+    """Collects LLM requests from concurrent sessions and submits them together.
+
+    The first request of a window arms a timer; everything that arrives before
+    it fires (or until `max_batch_size` is reached) goes upstream as one
+    `abatch` call and each caller gets its own result back.
+    """
+
+    def __init__(self, llm: Any, window: float = 0.01, max_batch_size: int = 16):
+        self.llm = llm
+        self.window = window
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[PendingRequest] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.batches = 0
+
+    async def submit(self, messages: List[Dict[str, str]]) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((messages, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+        # Runs even if the task is cancelled before it starts
+        task.add_done_callback(lambda _: self._fail_unanswered(batch))
+
+    async def _dispatch(self, batch: List[PendingRequest]):
+        self.requests += len(batch)
+        self.batches += 1
+        inputs = [messages for messages, _ in batch]
+        try:
+            if len(inputs) == 1:
+                results = [await self.llm.ainvoke(inputs[0])]
+            else:
+                results = await self.llm.abatch(inputs, return_exceptions=True)
+        except Exception as e:
+            logger.error(f"Error in batched LLM invocation: {e}")
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            # The caller may have been cancelled while the batch was in flight
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _fail_unanswered(batch: List[PendingRequest]):
+        # Dispatch cancelled or a short result list: never leave a caller waiting forever
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("LLM batch returned no result for this request"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
+# One batcher per upstream credential, shared by every session in the process
+_batchers: Dict[str, LLMBatcher] = {}
+
+@lru_cache(maxsize=None)
+def _batch_settings() -> Tuple[float, int]:
+    window_ms = float(os.environ.get(BATCH_WINDOW_ENV, "0") or 0)
+    max_batch_size = int(os.environ.get(BATCH_SIZE_ENV, "16") or 16)
+    return window_ms / 1000.0, max_batch_size
+
+def get_batcher(key: str, llm: Any) -> Optional[LLMBatcher]:
+    """Return the shared batcher for `key`, or None when batching is disabled.
+
+    Batching is opt-in: set LLM_BATCH_WINDOW_MS (e.g. 5-20) to enable it.
+    """
+    window, max_batch_size = _batch_settings()
+    if window <= 0:
+        return None
+    if key not in _batchers:
+        _batchers[key] = LLMBatcher(llm, window=window, max_batch_size=max_batch_size)
+    return _batchers[key]
+
+def batcher_stats() -> Dict[str, Any]:
+    requests = sum(batcher.requests for batcher in _batchers.values())
+    batches = sum(batcher.batches for batcher in _batchers.values())
+    return {
+        "enabled": _batch_settings()[0] > 0,
+        "requests": requests,
+        "batches": batches,
+        "avg_batch_size": round(requests / batches, 2) if batches else 0.0,
+    }
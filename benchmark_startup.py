@@ -0,0 +1,60 @@
+"""Startup-time benchmark for the chat server.
+
+Measures, in fresh interpreters, how long it takes to import `main` and enter
+the FastAPI lifespan (the point where a replica can accept connections), and
+checks that the heavy dependencies were not loaded on the way.
+
+    python benchmark_startup.py --runs 5 --budget 1.0
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["langchain_nvidia_ai_endpoints", "websockets"]
+
+_PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+
+async def enter_lifespan():
+    async with main.lifespan(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(enter_lifespan())
+print(json.dumps({{"import": imported - start, "ready": ready - start, "heavy": heavy}}))
+"""
+
+def run_probe() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(heavy=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds allowed until ready")
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.runs)]
+    import_times = [sample["import"] for sample in samples]
+    ready_times = [sample["ready"] for sample in samples]
+    heavy = sorted({name for sample in samples for name in sample["heavy"]})
+
+    print(f"import main: median {statistics.median(import_times) * 1000:.1f} ms, max {max(import_times) * 1000:.1f} ms")
+    print(f"ready:       median {statistics.median(ready_times) * 1000:.1f} ms, max {max(ready_times) * 1000:.1f} ms")
+    print(f"heavy modules loaded at import: {heavy or 'none'}")
+
+    if heavy or max(ready_times) > args.budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+from typing import Dict, Any, Optional, Union
+import logging
+import json
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+Frame = Union[str, bytes]
+
+# Preformatted "[Agent]: " headers so hot paths don't rebuild them per message
+AGENT_NAMES = ("Conversational Agent", "Diagnostic Agent", "Troubleshooting Agent", "Operator Agent")
+AGENT_PREFIXES: Dict[str, str] = {name: f"[{name}]: " for name in AGENT_NAMES}
+VALID_PREFIXES = tuple(f"[{name}]:" for name in AGENT_NAMES)
+
+def agent_header(agent_prefix: str) -> str:
+    return AGENT_PREFIXES.get(agent_prefix) or f"[{agent_prefix}]: "
+
+if orjson is not None:
+    def dumps(obj: Any) -> str:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            # orjson rejects lone surrogates and oversized ints; escape them as stdlib json does
+            return json.dumps(obj, separators=(",", ":"))
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    dumps = _encoder.encode
+    loads = json.loads
+
+class JsonCodec:
+    """Default codec: same JSON shape existing clients expect, sent as text frames.
+
+    The fixed envelope is pre-rendered so each message only encodes its text.
+    """
+    name = "json"
+    binary = False
+
+    def __init__(self):
+        self._envelopes = {
+            msg_type: (f'{{"type":{dumps(msg_type)},"content":{{"type":"text","text":', "}}")
+            for msg_type in ("message", "error")
+        }
+
+    def encode_message(self, text: str, msg_type: str = "message") -> str:
+        envelope = self._envelopes.get(msg_type)
+        if envelope is None:
+            return self.encode({"type": msg_type, "content": {"type": "text", "text": text}})
+        head, tail = envelope
+        return f"{head}{dumps(text)}{tail}"
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        return dumps(payload)
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        return loads(data)
+
+class MsgpackCodec:
+    """Binary MessagePack frames with the same logical shape as JsonCodec"""
+    name = "msgpack"
+    binary = True
+
+    def encode_message(self, text: str, msg_type: str = "message") -> bytes:
+        return msgpack.packb({"type": msg_type, "content": {"type": "text", "text": text}})
+
+    def encode(self, payload: Dict[str, Any]) -> bytes:
+        return msgpack.packb(payload)
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        if isinstance(data, str):
+            return loads(data)
+        return msgpack.unpackb(data)
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = MsgpackCodec() if msgpack is not None else None
+
+# Close code for clients that asked for a codec this server can't speak (RFC 6455 "unsupported data")
+UNSUPPORTED_CODEC_CLOSE = 1003
+
+def negotiate_codec(requested: Optional[str]) -> Optional[Union[JsonCodec, MsgpackCodec]]:
+    """Pick the codec a client asked for (e.g. ws://host/ws?codec=msgpack).
+
+    No request means JSON. Returns None when the requested codec is unknown or
+    not installed, so the caller can refuse the connection instead of silently
+    sending frames the client won't expect.
+    """
+    if not requested or requested.lower() == JSON_CODEC.name:
+        return JSON_CODEC
+    if requested.lower() == MsgpackCodec.name and MSGPACK_CODEC is not None:
+        return MSGPACK_CODEC
+    logger.warning(f"Client requested unsupported codec {requested!r}")
+    return None
+
+async def send_frame(websocket: Any, codec: Union[JsonCodec, MsgpackCodec], frame: Frame):
+    if codec.binary:
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
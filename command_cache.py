@@ -0,0 +1,159 @@
+from typing import Dict, Any, Optional, Tuple, FrozenSet
+from collections import OrderedDict
+from dataclasses import dataclass
+import logging
+import time
+import re
+
+from base import OperatorResponse
+
+logger = logging.getLogger(__name__)
+
+# Seconds a read-only result stays valid, keyed by OperatorAgentTool._determine_command_type.
+# Command types missing from this table are never cached.
+DEFAULT_TTLS: Dict[str, float] = {
+    "version_check": 300.0,
+    "package_check": 60.0,
+}
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_PACKAGE_TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._\-]*')
+_PIP_MUTATION_PATTERN = re.compile(r'\bpip3?\s+(install|uninstall)\b(.*)')
+_PIP_READ_PATTERN = re.compile(r'\bpip3?\s+show\b(.*)')
+_GREP_PATTERN = re.compile(r'\bgrep\b(.*)')
+_SHELL_SEPARATORS = ("|", "&&", "||", ";")
+# pip options whose targets are files, paths or URLs rather than package names
+_INDIRECT_INSTALL_OPTIONS = ("-r", "-e", "-c", "--requirement", "--editable", "--constraint")
+_ARCHIVE_SUFFIXES = (".whl", ".zip", ".tar.gz", ".tgz")
+
+CacheKey = Tuple[str, str]
+
+def normalize_command(command: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", command.strip().lower())
+
+def _package_names(args: str) -> FrozenSet[str]:
+    names = set()
+    for token in args.split():
+        if token.startswith("-"):
+            continue
+        if match := _PACKAGE_TOKEN_PATTERN.match(token):
+            names.add(match.group(0).lower().replace("_", "-"))
+    return frozenset(names)
+
+def mutated_packages(args: str) -> Optional[FrozenSet[str]]:
+    """Packages a pip install/uninstall argument list changes; None means the set is unknown"""
+    names = set()
+    for token in args.split():
+        if token in _SHELL_SEPARATORS:
+            break
+        if token.split("=", 1)[0] in _INDIRECT_INSTALL_OPTIONS:
+            return None
+        if token.startswith("-"):
+            continue
+        if ("/" in token or "\\" in token or "@" in token or token.startswith(".")
+                or token.endswith(_ARCHIVE_SUFFIXES)):
+            return None
+        if match := _PACKAGE_TOKEN_PATTERN.match(token):
+            names.add(match.group(0).lower().replace("_", "-"))
+    return frozenset(names) or None
+
+def referenced_packages(command: str) -> Optional[FrozenSet[str]]:
+    """Packages a read-only command is about; None means it covers every package"""
+    if match := _PIP_READ_PATTERN.search(command):
+        return _package_names(match.group(1))
+    if match := _GREP_PATTERN.search(command):
+        return _package_names(match.group(1)) or None
+    return None
+
+@dataclass
+class CacheEntry:
+    response: OperatorResponse
+    command_type: str
+    packages: Optional[FrozenSet[str]]
+    expires_at: float
+
+class OperatorCommandCache:
+    """TTL cache for read-only operator commands, keyed by host and normalized command.
+
+    Mutating commands invalidate the entries they can affect: `pip install X`
+    drops cached checks for X and unfiltered package listings, installs from
+    requirement files, paths or URLs drop every package check for the host,
+    and any other non-cacheable command drops everything cached for that host.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, max_entries: int = 1024):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def is_cacheable(self, command_type: str) -> bool:
+        return self.ttls.get(command_type, 0) > 0
+
+    def get(self, host: str, command: str, command_type: str) -> Optional[OperatorResponse]:
+        if not self.is_cacheable(command_type):
+            return None
+        key = (host, normalize_command(command))
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.response
+
+    def put(self, host: str, command: str, command_type: str, response: OperatorResponse):
+        if not self.is_cacheable(command_type) or response.status != "success":
+            return
+        normalized = normalize_command(command)
+        key = (host, normalized)
+        self._entries[key] = CacheEntry(
+            response=response,
+            command_type=command_type,
+            packages=referenced_packages(normalized),
+            expires_at=time.monotonic() + self.ttls[command_type]
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_for(self, host: str, command: str, command_type: str):
+        """Drop entries a command may have made stale; read-only commands are a no-op"""
+        if self.is_cacheable(command_type):
+            return
+        normalized = normalize_command(command)
+        if match := _PIP_MUTATION_PATTERN.search(normalized):
+            # Requirement files, paths and URLs can change any package
+            changed = mutated_packages(match.group(2))
+            stale = [
+                key for key, entry in self._entries.items()
+                if key[0] == host and entry.command_type == "package_check"
+                and (changed is None or entry.packages is None or entry.packages & changed)
+            ]
+        else:
+            stale = [key for key in self._entries if key[0] == host]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self.invalidations += len(stale)
+            logger.debug(f"Invalidated {len(stale)} cached operator results for {host}")
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+# Shared by every OperatorAgentTool in the process so sessions on the same host reuse results
+command_cache = OperatorCommandCache()
@@ -0,0 +1,157 @@
+from typing import Callable, Awaitable, AsyncIterator, Dict, Any, List, Optional, Iterable
+from dataclasses import dataclass, field
+from contextlib import aclosing
+import logging
+import asyncio
+
+from base import OperatorResponse, ConversationContext
+from command_cache import OperatorCommandCache
+from tools import OperatorAgentTool
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class HostResult:
+    host: str
+    status: str
+    final_result: Optional[str] = None
+    response: Optional[OperatorResponse] = None
+    elapsed: float = 0.0
+
+@dataclass
+class FanoutSummary:
+    command: str
+    results: List[HostResult] = field(default_factory=list)
+
+    @property
+    def status_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for result in self.results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+    def group_by_result(self) -> Dict[str, List[str]]:
+        """Hosts grouped by identical output, so N healthy desktops cost one line"""
+        groups: Dict[str, List[str]] = {}
+        for result in self.results:
+            key = result.final_result or f"<{result.status}>"
+            groups.setdefault(key, []).append(result.host)
+        return groups
+
+    def to_diagnostic_data(self) -> Dict[str, Any]:
+        """Compact payload for TroubleshootingTool.analyze (one LLM call for the whole pool)"""
+        return {
+            "issue_type": "fleet_scan",
+            "fanout_summary": {
+                "command": self.command,
+                "hosts": len(self.results),
+                "status_counts": self.status_counts,
+                "results": [
+                    {"output": output, "count": len(hosts), "hosts": sorted(hosts)}
+                    for output, hosts in sorted(
+                        self.group_by_result().items(), key=lambda item: len(item[1])
+                    )
+                ]
+            }
+        }
+
+async def _discard_message(message: str):
+    pass
+
+class OperatorFanout:
+    """Dispatch one operator command to many hosts with bounded parallelism.
+
+    Each host gets its own OperatorAgentTool sharing the process-wide command
+    cache. Hosts that miss `host_timeout` are reported with status "timeout"
+    instead of holding up the rest of the pool.
+    """
+
+    def __init__(
+        self,
+        ws_urls: Iterable[str],
+        max_concurrency: int = 8,
+        host_timeout: float = 30.0,
+        message_callback: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        cache: Optional[OperatorCommandCache] = None
+    ):
+        self.ws_urls = list(dict.fromkeys(ws_urls))
+        self.max_concurrency = max(1, max_concurrency)
+        self.host_timeout = host_timeout
+        self.message_callback = message_callback
+        self.cache = cache
+
+    def _tool_for(self, host: str) -> OperatorAgentTool:
+        if self.message_callback is None:
+            callback = _discard_message
+        else:
+            async def callback(message: str, host=host):
+                await self.message_callback(host, message)
+        return OperatorAgentTool(callback, cache=self.cache, ws_url=host)
+
+    async def _run_host(
+        self,
+        host: str,
+        command: str,
+        context: ConversationContext,
+        semaphore: asyncio.Semaphore
+    ) -> HostResult:
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            start_time = loop.time()
+            try:
+                response = await asyncio.wait_for(
+                    self._tool_for(host).execute(command, context),
+                    timeout=self.host_timeout
+                )
+                return HostResult(
+                    host=host,
+                    status=response.status,
+                    final_result=response.final_result,
+                    response=response,
+                    elapsed=loop.time() - start_time
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Operator fan-out timed out on {host}")
+                return HostResult(host=host, status="timeout", elapsed=loop.time() - start_time)
+            except Exception as e:
+                logger.error(f"Operator fan-out error on {host}: {e}")
+                return HostResult(
+                    host=host,
+                    status="error",
+                    final_result=f"[Operator Agent]: Error - {str(e)}",
+                    elapsed=loop.time() - start_time
+                )
+
+    async def stream(self, command: str, context: ConversationContext) -> AsyncIterator[HostResult]:
+        """Yield per-host results as they complete.
+
+        Unfinished hosts are cancelled when the generator closes; a caller that
+        may stop early should iterate inside `contextlib.aclosing(...)`.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.create_task(self._run_host(host, command, context, semaphore))
+            for host in self.ws_urls
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def run(
+        self,
+        command: str,
+        context: ConversationContext,
+        on_result: Optional[Callable[[HostResult], Awaitable[None]]] = None
+    ) -> FanoutSummary:
+        logger.info(f"Operator fan-out of '{command}' to {len(self.ws_urls)} hosts")
+        summary = FanoutSummary(command=command)
+        async with aclosing(self.stream(command, context)) as results:
+            async for result in results:
+                summary.results.append(result)
+                if on_result is not None:
+                    await on_result(result)
+        return summary
@@ -0,0 +1,140 @@
+from typing import Dict, Any, Optional
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+import logging
+import random
+import queue
+import json
+import os
+
+LOG_LEVEL_ENV = "LOG_LEVEL"
+LOG_SAMPLE_RATES_ENV = "LOG_SAMPLE_RATES"
+LOG_MAX_FIELD_LENGTH_ENV = "LOG_MAX_FIELD_LENGTH"
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_stream_handler: Optional[logging.Handler] = None
+
+# Core keys of every record; caller fields with these names are written as field_<name>
+_RESERVED_KEYS = frozenset(("ts", "level", "logger", "event", "message", "exc"))
+
+def _truncate(value: Any, limit: int) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        # Binary frames (e.g. msgpack) are logged as text instead of a bytes repr
+        text = bytes(value[:limit]).decode("utf-8", errors="replace")
+        if len(value) > limit:
+            return f"{text}...[{len(value) - limit} more bytes]"
+        return text
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}...[{len(value) - limit} more chars]"
+    return value
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; string and bytes fields are capped at `max_field_length`.
+
+    Caller fields never overwrite the core keys: a colliding field is written as `field_<name>`.
+    """
+
+    def __init__(self, max_field_length: int = 1024):
+        super().__init__()
+        self.max_field_length = max_field_length
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": _truncate(record.getMessage(), self.max_field_length),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            for key, value in fields.items():
+                name = f"field_{key}" if key in _RESERVED_KEYS else key
+                payload[name] = _truncate(value, self.max_field_length)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+class _DeferredQueueHandler(QueueHandler):
+    # The stock prepare() formats the record on the caller's thread; defer it to the listener
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class EventSampler:
+    """Per-event sampling rates; events without a rate are always kept"""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        self.rates = dict(rates or {})
+
+    @classmethod
+    def from_env(cls) -> "EventSampler":
+        rates = {}
+        for item in os.environ.get(LOG_SAMPLE_RATES_ENV, "").split(","):
+            if "=" in item:
+                event, rate = item.split("=", 1)
+                rates[event.strip()] = float(rate)
+        return cls(rates)
+
+    def sample(self, event: str) -> bool:
+        rate = self.rates.get(event)
+        return rate is None or rate >= 1.0 or random.random() < rate
+
+sampler = EventSampler.from_env()
+
+def log_event(logger: logging.Logger, level: int, event: str, message: str, /, **fields: Any):
+    """Emit a structured record, paying only a level check when it is filtered or sampled out.
+
+    Warnings and errors are never sampled.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.WARNING and not sampler.sample(event):
+        return
+    logger.log(level, message, extra={"event": event, "fields": fields})
+
+def configure_logging(
+    level: Optional[str] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+    max_field_length: Optional[int] = None
+):
+    """Route all logging through a queue to a background JSON writer. Safe to call more than once."""
+    global _listener, _queue_handler, _stream_handler
+    if _listener is not None:
+        return
+    if sample_rates is not None:
+        sampler.rates = dict(sample_rates)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter(
+        max_field_length or int(os.environ.get(LOG_MAX_FIELD_LENGTH_ENV, "1024"))
+    ))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _queue_handler = _DeferredQueueHandler(log_queue)
+    _stream_handler = stream_handler
+    root.addHandler(_queue_handler)
+    root.setLevel(level or os.environ.get(LOG_LEVEL_ENV, "INFO"))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread.
+
+    Later records (e.g. from connection cleanup after the lifespan exits) are
+    written synchronously by the same JSON handler; configure_logging can
+    reinstall the queue.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.addHandler(_stream_handler)
+    root.removeHandler(_queue_handler)
+    _listener.stop()
+    _listener = None
+    _queue_handler = None
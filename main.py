@@ -3,30 +3,37 @@ from fastapi.middleware.cors import CORSMiddleware
 import json
 import asyncio
 import logging
-from agents import ConversationalAgent
+from agents import ConversationalAgent, API_KEY
+from base import warm_up_llm_client
+from command_cache import command_cache
+from batching import batcher_stats
+from log_pipeline import configure_logging, shutdown_logging, log_event
+from sessions import SessionManager
+from scheduler import scheduler
+from codec import JSON_CODEC, UNSUPPORTED_CODEC_CLOSE, VALID_PREFIXES, agent_header, negotiate_codec, send_frame
 from contextlib import asynccontextmanager
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Store active connections and their agents
-connections = {}
+# Active connections and their agents
+sessions = SessionManager()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up FastAPI server...")
+    # Accept connections immediately; the LLM client is imported and built in the background
+    warm_up = asyncio.create_task(asyncio.to_thread(warm_up_llm_client, API_KEY))
+    sessions.start()
+    scheduler.start()
     yield
+    if not warm_up.done():
+        warm_up.cancel()
     logger.info("Shutting down FastAPI server...")
     # Clean up connections
-    for connection in list(connections.keys()):
-        try:
-            await connection.close()
-        except:
-            logger.error(f"Error closing connection during shutdown")
-    connections.clear()
+    await scheduler.stop()
+    await sessions.close_all()
+    shutdown_logging()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -40,45 +47,24 @@ app.add_middleware(
 
 async def validate_message(message: str, agent_prefix: str) -> str:
     """Ensure message has proper agent prefix and formatting"""
-    valid_prefixes = [
-        "[Conversational Agent]:",
-        "[Diagnostic Agent]:",
-        "[Troubleshooting Agent]:",
-        "[Operator Agent]:"
-    ]
-    
-    if not any(message.startswith(prefix) for prefix in valid_prefixes):
-        if agent_prefix:
-            return f"[{agent_prefix}]: {message}"
-        return f"[System]: {message}"
+    if not message.startswith(VALID_PREFIXES):
+        return f"{agent_header(agent_prefix or 'System')}{message}"
     return message
 
-async def send_message_to_client(websocket: WebSocket, message: str, agent_prefix: str = None):
+async def send_message_to_client(websocket: WebSocket, message: str, agent_prefix: str = None, codec=JSON_CODEC):
     """Send formatted message to client with error handling"""
     try:
         formatted_message = await validate_message(message, agent_prefix)
-        logger.info(f"Sending message: {formatted_message}")
+        log_event(logger, logging.INFO, "message_sent", "Sending message", body=formatted_message)
         
-        await websocket.send_json({
-            "type": "message",
-            "content": {
-                "type": "text",
-                "text": formatted_message
-            }
-        })
+        await send_frame(websocket, codec, codec.encode_message(formatted_message, "message"))
         await asyncio.sleep(0.5)  # Delay for message readability
         
     except Exception as e:
         logger.error(f"Error sending message: {e}")
         try:
             error_message = f"[System Error]: Failed to send message - {str(e)}"
-            await websocket.send_json({
-                "type": "error",
-                "content": {
-                    "type": "text",
-                    "text": error_message
-                }
-            })
+            await send_frame(websocket, codec, codec.encode_message(error_message, "error"))
         except:
             logger.error("Failed to send error message")
 
@@ -86,28 +72,42 @@ async def send_message_to_client(websocket: WebSocket, message: str, agent_prefi
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     logger.info("New WebSocket connection accepted")
+
+    # Clients opt into binary frames with ?codec=msgpack; everyone else keeps the JSON shape
+    requested_codec = websocket.query_params.get("codec")
+    codec = negotiate_codec(requested_codec)
+    if codec is None:
+        # Tell the client why instead of answering its binary frames with JSON text
+        await websocket.close(code=UNSUPPORTED_CODEC_CLOSE, reason=f"Unsupported codec: {requested_codec}")
+        return
+    # Application-level {"type": "ping"} frames are only sent to clients that ask for them
+    # with ?heartbeat=1; liveness for everyone else relies on protocol-level pings
+    heartbeat = websocket.query_params.get("heartbeat") in ("1", "true")
+    session = None
     
     async def message_callback(message: str):
-        await send_message_to_client(websocket, message)
+        await send_message_to_client(websocket, message, codec=codec)
     
     try:
         # Initialize agent
         agent = ConversationalAgent(message_callback)
-        connections[websocket] = {
-            'agent': agent,
-            'active': True,
-            'messages_processed': 0
-        }
+        session = await sessions.register(websocket, agent, codec, heartbeat=heartbeat)
         
-        while connections[websocket]['active']:
+        while session.active:
             try:
                 # Receive and validate message
-                data = await websocket.receive_text()
-                logger.info(f"Received message: {data}")
+                data = await (websocket.receive_bytes() if codec.binary else websocket.receive_text())
+                log_event(logger, logging.INFO, "message_received", "Received message", body=data)
                 
                 # Parse message
                 try:
-                    message_data = json.loads(data)
+                    message_data = codec.decode(data)
+
+                    # Heartbeat replies only prove liveness; they don't count as activity
+                    if message_data.get("type") == "pong":
+                        sessions.record_pong(websocket)
+                        continue
+
                     user_message = message_data.get("message", "").strip()
                     
                     if not user_message:
@@ -115,17 +115,23 @@ async def websocket_endpoint(websocket: WebSocket):
                         continue
                     
                     # Process message
-                    connections[websocket]['messages_processed'] += 1
-                    logger.info(f"Processing message #{connections[websocket]['messages_processed']}")
+                    sessions.touch(websocket)
+                    session.messages_processed += 1
+                    log_event(
+                        logger, logging.DEBUG, "message_processing", "Processing message",
+                        sequence=session.messages_processed
+                    )
                     
                     await agent.get_response(user_message)
+                    sessions.enforce_memory(session)
                     
-                except json.JSONDecodeError as e:
+                except (json.JSONDecodeError, ValueError) as e:
                     logger.error(f"JSON decode error: {e}")
                     await send_message_to_client(
                         websocket,
                         "I couldn't process that message. Please try again with a valid format.",
-                        "Conversational Agent"
+                        "Conversational Agent",
+                        codec=codec
                     )
                     
             except WebSocketDisconnect:
@@ -137,26 +143,37 @@ async def websocket_endpoint(websocket: WebSocket):
                 await send_message_to_client(
                     websocket,
                     f"I encountered an error while processing your message: {str(e)}",
-                    "Conversational Agent"
+                    "Conversational Agent",
+                    codec=codec
                 )
                 
+    except asyncio.CancelledError:
+        # The session manager cancels evicted sessions; any other cancellation
+        # (e.g. server shutdown) must propagate
+        if session is None or session.active:
+            raise
+        logger.info("WebSocket session evicted")
+
     except Exception as e:
         logger.error(f"WebSocket connection error: {e}")
         try:
             await send_message_to_client(
                 websocket,
                 "Connection error occurred. Please refresh the page and try again.",
-                "System"
+                "System",
+                codec=codec
             )
         except:
             logger.error("Failed to send final error message")
             
     finally:
         # Clean up connection
-        if websocket in connections:
-            logger.info(f"Cleaning up connection. Processed {connections[websocket]['messages_processed']} messages.")
-            connections[websocket]['active'] = False
-            del connections[websocket]
+        session = sessions.unregister(websocket)
+        if session is not None:
+            log_event(
+                logger, logging.INFO, "connection_closed", "Cleaning up connection",
+                messages_processed=session.messages_processed
+            )
         try:
             await websocket.close()
         except:
@@ -167,11 +184,16 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "active_connections": len(connections),
+        "active_connections": len(sessions),
+        "sessions": sessions.stats(),
+        "operator_cache": command_cache.stats(),
+        "llm_batching": batcher_stats(),
+        "background_jobs": scheduler.stats(),
         "uptime": "available"
     }
 
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting FastAPI server...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Protocol-level ping/pong detects half-open connections for every client
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_ping_interval=20.0, ws_ping_timeout=20.0)
\ No newline at end of file
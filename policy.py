@@ -0,0 +1,229 @@
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+import operator
+import logging
+import json
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+POLICY_PATH_ENV = "COMPLIANCE_POLICY_PATH"
+
+DEFAULT_POLICY: Dict[str, Any] = {
+    "python": ">=3.10",
+    "required_packages": {},
+    "forbidden_packages": {},
+}
+
+VersionTuple = Tuple[int, int, int]
+VersionCheck = Callable[[VersionTuple], bool]
+
+_VERSION_PATTERN = re.compile(r'(\d+)(?:\.(\d+))?(?:\.(\d+))?')
+_SPECIFIER_PATTERN = re.compile(r'^\s*(==|!=|>=|<=|>|<|~=)?\s*(\d+(?:\.\d+)*)(\.\*)?\s*$')
+
+_OPERATORS: Dict[str, Callable[[VersionTuple, VersionTuple], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+def version_tuple(version: str) -> VersionTuple:
+    """Convert a version string like '3.10.2' into a comparable (3, 10, 2) tuple"""
+    match = _VERSION_PATTERN.search(version or "")
+    if not match:
+        raise ValueError(f"Invalid version: {version!r}")
+    major, minor, patch = match.groups()
+    return (int(major), int(minor or 0), int(patch or 0))
+
+def normalize_package_name(name: str) -> str:
+    return name.strip().lower().replace("_", "-")
+
+def _compile_clause(clause: str) -> VersionCheck:
+    match = _SPECIFIER_PATTERN.match(clause)
+    if not match:
+        raise ValueError(f"Invalid version specifier: {clause!r}")
+    op, version, wildcard = match.groups()
+    op = op or "=="
+
+    # Wildcards (==3.10.*) match on the given release prefix only
+    if wildcard:
+        if op not in ("==", "!="):
+            raise ValueError(f"Wildcard only allowed with == or !=: {clause!r}")
+        prefix = tuple(int(part) for part in version.split("."))
+        size = len(prefix)
+        if op == "==":
+            return lambda v: v[:size] == prefix
+        return lambda v: v[:size] != prefix
+
+    target = version_tuple(version)
+
+    # Compatible release: ~=3.10 means >=3.10,<4 and ~=3.10.2 means >=3.10.2,<3.11
+    if op == "~=":
+        depth = version.count(".")
+        if depth == 0:
+            raise ValueError(f"Compatible release needs at least two components: {clause!r}")
+        upper = target[:depth - 1] + (target[depth - 1] + 1,)
+        upper_size = len(upper)
+        return lambda v: v >= target and v[:upper_size] < upper
+
+    compare = _OPERATORS[op]
+    return lambda v: compare(v, target)
+
+def compile_specifier(specifier: Optional[str]) -> VersionCheck:
+    """Compile a specifier such as '>=3.10,<4' into a single version check.
+
+    An empty specifier or '*' matches every version.
+    """
+    if specifier is not None and not isinstance(specifier, str):
+        raise ValueError(f"Version specifier must be a string: {specifier!r}")
+    if not specifier or specifier.strip() in ("", "*"):
+        return lambda v: True
+    checks = [_compile_clause(clause) for clause in specifier.split(",") if clause.strip()]
+    if len(checks) == 1:
+        return checks[0]
+    return lambda v: all(check(v) for check in checks)
+
+@dataclass(frozen=True)
+class PackageRule:
+    name: str
+    specifier: str
+    check: VersionCheck = field(compare=False, repr=False)
+
+@dataclass(frozen=True)
+class PolicyViolation:
+    rule: str
+    subject: str
+    message: str
+
+@dataclass
+class PolicyResult:
+    is_compliant: bool
+    violations: List[PolicyViolation]
+
+    @property
+    def messages(self) -> List[str]:
+        return [violation.message for violation in self.violations]
+
+class CompliancePolicy:
+    """Compliance rules compiled once into version comparators.
+
+    Rules are declared as a dict (or JSON file) of the form:
+        {
+            "python": ">=3.10",
+            "required_packages": {"numpy": ">=1.21"},
+            "forbidden_packages": {"tensorflow": "<2.0", "pycrypto": "*"}
+        }
+    """
+
+    def __init__(self, rules: Dict[str, Any]):
+        if not isinstance(rules, dict):
+            raise ValueError(f"Compliance policy must be an object, got {type(rules).__name__}")
+        self.python_specifier: str = rules.get("python") or ""
+        self._python_check = compile_specifier(self.python_specifier)
+        self.required: Dict[str, PackageRule] = self._compile_packages(rules.get("required_packages"))
+        self.forbidden: Dict[str, PackageRule] = self._compile_packages(rules.get("forbidden_packages"))
+
+    @classmethod
+    def from_file(cls, path: str) -> "CompliancePolicy":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _compile_packages(packages: Optional[Dict[str, str]]) -> Dict[str, PackageRule]:
+        if packages is not None and not isinstance(packages, dict):
+            raise ValueError(f"Package rules must map names to specifiers: {packages!r}")
+        compiled = {}
+        for name, specifier in (packages or {}).items():
+            key = normalize_package_name(name)
+            compiled[key] = PackageRule(key, specifier or "*", compile_specifier(specifier))
+        return compiled
+
+    def check_python(self, version: Optional[str]) -> bool:
+        try:
+            return self._python_check(version_tuple(version))
+        except ValueError:
+            return False
+
+    def evaluate(
+        self,
+        python_version: Optional[str],
+        packages: Optional[Dict[str, Optional[str]]] = None,
+        complete_inventory: bool = False
+    ) -> PolicyResult:
+        """Evaluate a system inventory against every rule in a single pass.
+
+        `packages` maps package name to installed version (None means known
+        to be absent). Required packages missing from the inventory are only
+        reported when `complete_inventory` is set, since per-turn inventories
+        are usually partial.
+        """
+        violations: List[PolicyViolation] = []
+
+        if python_version is not None and not self.check_python(python_version):
+            violations.append(PolicyViolation(
+                "python", "python",
+                f"Python {python_version} does not satisfy requirement {self.python_specifier}"
+            ))
+
+        seen_required = 0
+        for name, version in (packages or {}).items():
+            key = normalize_package_name(name)
+            required = self.required.get(key)
+            forbidden = self.forbidden.get(key)
+            if required is None and forbidden is None:
+                continue
+
+            parsed = None
+            if version:
+                try:
+                    parsed = version_tuple(version)
+                except ValueError:
+                    logger.warning(f"Unparseable version for {key}: {version}")
+
+            if required is not None:
+                seen_required += 1
+                if version is None:
+                    violations.append(PolicyViolation(
+                        "required", key, f"Required package {key} is not installed"
+                    ))
+                elif parsed is None or not required.check(parsed):
+                    violations.append(PolicyViolation(
+                        "required", key,
+                        f"Package {key} {version} does not satisfy requirement {required.specifier}"
+                    ))
+
+            if forbidden is not None and version is not None:
+                if parsed is None or forbidden.check(parsed):
+                    violations.append(PolicyViolation(
+                        "forbidden", key,
+                        f"Package {key} {version} is forbidden ({forbidden.specifier})"
+                    ))
+
+        if complete_inventory and seen_required < len(self.required):
+            inventory = {normalize_package_name(name) for name in (packages or {})}
+            for key in self.required:
+                if key not in inventory:
+                    violations.append(PolicyViolation(
+                        "required", key, f"Required package {key} is not installed"
+                    ))
+
+        return PolicyResult(is_compliant=not violations, violations=violations)
+
+@lru_cache(maxsize=None)
+def get_policy(path: Optional[str] = None) -> CompliancePolicy:
+    """Load and compile a policy once per process.
+
+    Falls back to COMPLIANCE_POLICY_PATH and then to the built-in default.
+    """
+    path = path or os.environ.get(POLICY_PATH_ENV)
+    if path:
+        try:
+            return CompliancePolicy.from_file(path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading compliance policy from {path}: {e}")
+    return CompliancePolicy(DEFAULT_POLICY)
@@ -0,0 +1,150 @@
+from typing import Callable, Awaitable, Dict, Any, List, Optional
+from dataclasses import dataclass, field
+import itertools
+import logging
+import asyncio
+
+from log_pipeline import log_event
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+JobFactory = Callable[[], Awaitable[Any]]
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    sequence: int
+    key: str = field(compare=False)
+    factory: JobFactory = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    task: Optional[asyncio.Task] = field(default=None, compare=False)
+
+class BackgroundScheduler:
+    """Runs deferred, non-interactive agent work off the user-facing turn.
+
+    Jobs are ordered by priority (lower runs first, FIFO within a priority)
+    and executed by at most `max_workers` concurrent workers. Submitting a
+    key that is already pending returns the pending job's future instead of
+    queueing a duplicate. `cancel(prefix)` drops queued and running jobs,
+    e.g. every job of a session that has ended.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, max_workers)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._pending: Dict[str, _Job] = {}
+        self._running: Dict[int, _Job] = {}
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self.completed = 0
+        self.failed = 0
+        self.deduplicated = 0
+        self.cancelled = 0
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = self._queue or asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for job in self._pending.values():
+            if not job.future.done():
+                job.future.cancel()
+        self._pending.clear()
+        self._running.clear()
+        self._queue = None
+
+    def submit(self, key: str, factory: JobFactory, priority: int = PRIORITY_NORMAL) -> asyncio.Future:
+        """Queue `factory()` to run in the background; returns a future for its result"""
+        if key in self._pending:
+            self.deduplicated += 1
+            return self._pending[key].future
+
+        self.start()
+        job = _Job(
+            priority=priority,
+            sequence=next(self._sequence),
+            key=key,
+            factory=factory,
+            future=asyncio.get_running_loop().create_future()
+        )
+        self._pending[key] = job
+        self._queue.put_nowait(job)
+        return job.future
+
+    def cancel(self, prefix: str) -> int:
+        """Cancel every queued or running job whose key starts with `prefix`"""
+        count = 0
+        for key in [key for key in self._pending if key.startswith(prefix)]:
+            # Left in the queue; the worker skips jobs whose future is already done
+            self._pending.pop(key).future.cancel()
+            count += 1
+        for job in list(self._running.values()):
+            if job.key.startswith(prefix) and job.task is not None and job.task.cancel():
+                count += 1
+        self.cancelled += count
+        return count
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.future.done():
+                    continue
+                # Once running, a new submit with the same key queues a fresh job
+                self._pending.pop(job.key, None)
+                # The job runs in its own task so cancel() can stop it without killing the worker
+                job.task = asyncio.ensure_future(job.factory())
+                self._running[job.sequence] = job
+                try:
+                    await asyncio.wait((job.task,))
+                except asyncio.CancelledError:
+                    job.task.cancel()
+                    if not job.future.done():
+                        job.future.cancel()
+                    raise
+                finally:
+                    self._running.pop(job.sequence, None)
+                self._settle(job)
+            finally:
+                self._queue.task_done()
+
+    def _settle(self, job: _Job):
+        if job.task.cancelled():
+            if not job.future.done():
+                job.future.cancel()
+            return
+        error = job.task.exception()
+        if error is None:
+            self.completed += 1
+            if not job.future.done():
+                job.future.set_result(job.task.result())
+            return
+        self.failed += 1
+        log_event(logger, logging.ERROR, "background_job_failed", f"Background job failed: {error}", key=job.key)
+        if not job.future.done():
+            job.future.set_exception(error)
+            # Nobody may be awaiting the future; mark the exception as retrieved
+            job.future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "deduplicated": self.deduplicated,
+            "cancelled": self.cancelled,
+        }
+
+# Shared by every session in the process
+scheduler = BackgroundScheduler()
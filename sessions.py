@@ -0,0 +1,228 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+import logging
+import asyncio
+import uuid
+import json
+import time
+import os
+
+from log_pipeline import log_event
+from codec import JSON_CODEC, send_frame
+
+logger = logging.getLogger(__name__)
+
+SESSION_SPILL_DIR_ENV = "SESSION_SPILL_DIR"
+
+@dataclass
+class Session:
+    websocket: Any
+    agent: Any
+    session_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.monotonic)
+    last_active: float = field(default_factory=time.monotonic)
+    last_pong: Optional[float] = None
+    messages_processed: int = 0
+    active: bool = True
+    task: Optional[asyncio.Task] = None
+    codec: Any = JSON_CODEC
+    heartbeat: bool = False
+
+class SessionManager:
+    """Owns every live connection and reclaims the ones that go quiet.
+
+    - Half-open TCP peers are detected by protocol-level WebSocket pings
+      (uvicorn `ws_ping_interval`/`ws_ping_timeout`), which close the socket
+      and end the session's receive loop.
+    - Clients that opt in (`heartbeat=True`) additionally get an application
+      `{"type": "ping"}` every `heartbeat_interval` seconds and are evicted if
+      they don't answer with a pong within `heartbeat_timeout`. Other clients
+      never receive ping frames.
+    - A periodic sweep evicts sessions without user activity for `idle_timeout`.
+    - Conversation history is trimmed to `memory_budget_bytes` per session.
+    - Beyond `max_sessions`, the least recently active session is evicted.
+
+    Evicted sessions are written to `spill_dir` (if set) before being dropped.
+    Unregistering a session cancels its agent's background jobs.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 500,
+        idle_timeout: float = 900.0,
+        heartbeat_interval: float = 30.0,
+        heartbeat_timeout: float = 90.0,
+        memory_budget_bytes: int = 512 * 1024,
+        spill_dir: Optional[str] = None
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = spill_dir if spill_dir is not None else os.environ.get(SESSION_SPILL_DIR_ENV)
+        self._sessions: "OrderedDict[Any, Session]" = OrderedDict()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.evictions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, websocket: Any) -> bool:
+        return websocket in self._sessions
+
+    def get(self, websocket: Any) -> Optional[Session]:
+        return self._sessions.get(websocket)
+
+    async def register(
+        self,
+        websocket: Any,
+        agent: Any,
+        codec: Any = JSON_CODEC,
+        heartbeat: bool = False
+    ) -> Session:
+        session = Session(
+            websocket=websocket,
+            agent=agent,
+            task=asyncio.current_task(),
+            codec=codec,
+            heartbeat=heartbeat,
+            # Opted-in clients owe a pong from the start, so silence is detectable
+            last_pong=time.monotonic() if heartbeat else None
+        )
+        self._sessions[websocket] = session
+        while len(self._sessions) > self.max_sessions:
+            _, oldest = next(iter(self._sessions.items()))
+            await self.evict(oldest, "session_cap")
+        return session
+
+    def touch(self, websocket: Any):
+        """Record user activity and move the session to the most-recently-used end"""
+        session = self._sessions.get(websocket)
+        if session is not None:
+            session.last_active = time.monotonic()
+            self._sessions.move_to_end(websocket)
+
+    def record_pong(self, websocket: Any):
+        session = self._sessions.get(websocket)
+        if session is not None:
+            session.last_pong = time.monotonic()
+
+    def enforce_memory(self, session: Session):
+        dropped = session.agent.context.trim_history(self.memory_budget_bytes)
+        if dropped:
+            log_event(
+                logger, logging.DEBUG, "session_trimmed", "Trimmed session history",
+                session_id=session.session_id, dropped=dropped
+            )
+
+    def unregister(self, websocket: Any) -> Optional[Session]:
+        session = self._sessions.pop(websocket, None)
+        if session is not None:
+            session.active = False
+            # Nobody is left to receive the results of the session's background jobs
+            session.agent.cancel_background_jobs()
+        return session
+
+    async def evict(self, session: Session, reason: str):
+        if self.unregister(session.websocket) is None:
+            return
+        self.evictions[reason] = self.evictions.get(reason, 0) + 1
+        log_event(
+            logger, logging.INFO, "session_evicted", "Evicting session",
+            session_id=session.session_id, reason=reason
+        )
+        if self.spill_dir:
+            # Snapshot on the loop; the session's task may still be mutating its context
+            snapshot = self._snapshot(session)
+            await asyncio.to_thread(self._spill, session.session_id, snapshot)
+        await self._close(session.websocket, code=1001)
+        # A half-open socket never delivers a disconnect, so unblock its receive loop directly
+        if session.task is not None and session.task is not asyncio.current_task():
+            session.task.cancel()
+
+    def _snapshot(self, session: Session) -> Dict[str, Any]:
+        context = session.agent.context
+        return {
+            "session_id": session.session_id,
+            "messages": [dict(message) for message in context.messages],
+            "system_context": asdict(context.system_context),
+            "last_agent": context.last_agent,
+            "current_issue": context.current_issue
+        }
+
+    def _spill(self, session_id: str, snapshot: Dict[str, Any]):
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"{session_id}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+        except Exception as e:
+            logger.error(f"Error spilling session {session_id}: {e}")
+
+    async def _close(self, websocket: Any, code: int = 1000):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            # Already closed or half-open; nothing left to release
+            pass
+
+    async def _heartbeat_once(self):
+        now = time.monotonic()
+        stale: List[tuple] = []
+        live: List[Session] = []
+        for session in list(self._sessions.values()):
+            if now - session.last_active > self.idle_timeout:
+                stale.append((session, "idle"))
+            elif not session.heartbeat:
+                continue
+            elif now - session.last_pong > self.heartbeat_timeout:
+                stale.append((session, "heartbeat"))
+            else:
+                live.append(session)
+
+        async def ping(session: Session):
+            try:
+                await asyncio.wait_for(
+                    send_frame(session.websocket, session.codec, session.codec.encode({"type": "ping"})),
+                    timeout=self.heartbeat_interval
+                )
+            except Exception:
+                await self.evict(session, "heartbeat")
+
+        await asyncio.gather(
+            *(self.evict(session, reason) for session, reason in stale),
+            *(ping(session) for session in live)
+        )
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat_once()
+            except Exception as e:
+                logger.error(f"Error in session heartbeat: {e}")
+
+    def start(self):
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def close_all(self):
+        """Stop the heartbeat and close every connection concurrently"""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            session.active = False
+            session.agent.cancel_background_jobs()
+        await asyncio.gather(*(self._close(session.websocket) for session in sessions))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "evictions": dict(self.evictions),
+        }
@@ -0,0 +1,65 @@
+import asyncio
+
+from agents import ConversationalAgent
+from base import AgentResponse, OperatorResponse
+from scheduler import scheduler
+
+
+class FakeOperator:
+    def __init__(self, output):
+        self.output = output
+        self.commands = []
+
+    async def execute(self, command, context):
+        self.commands.append(command)
+        return OperatorResponse(is_complete=True, messages=[self.output], final_result=self.output)
+
+
+class FakeTroubleshooting:
+    async def analyze(self, data, context):
+        return AgentResponse(message=f"verified {data['package']}: {data['status']}", next_action="none", data={})
+
+
+def _agent(sent, output="numpy 1.26.4"):
+    async def callback(message):
+        sent.append(message)
+
+    agent = ConversationalAgent(callback)
+    agent.operator_tool = FakeOperator(output)
+    agent.troubleshooting_tool = FakeTroubleshooting()
+    return agent
+
+
+def test_verification_runs_during_a_turn_and_reports_after_it():
+    async def scenario():
+        sent = []
+        agent = _agent(sent)
+        async with agent._turn_lock:
+            # A slow turn is in progress; the job's operator call still completes
+            await asyncio.wait_for(agent._defer("verify_install:numpy", lambda: agent._verify_installation("numpy")), 1.0)
+            await asyncio.sleep(0.01)
+            assert sent == []
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return agent, sent
+
+    agent, sent = asyncio.run(scenario())
+    assert agent.operator_tool.commands == ["pip list | grep numpy"]
+    assert sent == ["verified numpy: installed"]
+    assert agent.context.system_context.installed_packages == {"numpy": "1.26.4"}
+
+
+def test_cancel_background_jobs_drops_unreported_results():
+    async def scenario():
+        sent = []
+        agent = _agent(sent)
+        async with agent._turn_lock:
+            await agent._defer("verify_install:numpy", lambda: agent._verify_installation("numpy"))
+            agent.cancel_background_jobs()
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return agent, sent
+
+    agent, sent = asyncio.run(scenario())
+    assert sent == []
+    assert agent.context.system_context.installed_packages == {}
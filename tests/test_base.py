@@ -0,0 +1,36 @@
+from base import ConversationContext, PromptBuilder, SYSTEM_PROMPTS
+
+
+def _conversation(turns):
+    context = ConversationContext()
+    for i in range(turns):
+        context.add_message("user", f"question {i}")
+        context.add_message("assistant", f"answer {i}", agent="Conversational Agent")
+    context.add_message("user", "latest question")
+    return context
+
+
+def test_build_orders_prefix_history_then_latest_user_turn_once():
+    context = _conversation(4)
+    messages = PromptBuilder("Conversational", history_limit=5).build(context=context)
+
+    assert messages[0] == {"role": "system", "content": SYSTEM_PROMPTS["Conversational"]}
+    assert messages[1:] == context.llm_messages[-5:]
+    assert messages[-1] == {"role": "user", "content": "latest question"}
+    assert [m["content"] for m in messages].count("latest question") == 1
+
+
+def test_build_without_history_sends_only_prefix_and_user_content():
+    context = _conversation(2)
+    messages = PromptBuilder("Diagnostic", history_limit=0).build("check python", context=context)
+
+    assert messages == [
+        {"role": "system", "content": SYSTEM_PROMPTS["Diagnostic"]},
+        {"role": "user", "content": "check python"},
+    ]
+
+
+def test_prefix_is_shared_across_builds():
+    builder = PromptBuilder("Troubleshooting", history_limit=0)
+    first, second = builder.build("one"), builder.build("two")
+    assert first[0] is second[0]
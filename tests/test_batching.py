@@ -0,0 +1,142 @@
+import asyncio
+
+from batching import LLMBatcher, _batch_settings, batcher_stats
+
+
+class _Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.batch_sizes = []
+
+    def _answer(self, messages):
+        content = messages[-1]["content"]
+        if content == self.fail_on:
+            raise RuntimeError(f"failed: {content}")
+        return _Reply(f"answer to {content}")
+
+    async def ainvoke(self, messages):
+        self.batch_sizes.append(1)
+        return self._answer(messages)
+
+    async def abatch(self, inputs, return_exceptions=False):
+        self.batch_sizes.append(len(inputs))
+        results = []
+        for messages in inputs:
+            try:
+                results.append(self._answer(messages))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+
+def _request(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_concurrent_requests_share_a_batch_and_get_their_own_result():
+    llm = FakeLLM()
+    batcher = LLMBatcher(llm, window=0.01, max_batch_size=16)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(_request(f"q{i}")) for i in range(5)))
+
+    replies = asyncio.run(run())
+    assert [reply.content for reply in replies] == [f"answer to q{i}" for i in range(5)]
+    assert llm.batch_sizes == [5]
+    assert batcher.stats()["avg_batch_size"] == 5
+
+
+def test_full_batch_flushes_before_the_window():
+    llm = FakeLLM()
+    batcher = LLMBatcher(llm, window=10.0, max_batch_size=3)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(_request(f"q{i}")) for i in range(3))),
+            timeout=1.0
+        )
+
+    asyncio.run(run())
+    assert llm.batch_sizes == [3]
+
+
+def test_failures_are_routed_to_the_failing_caller_only():
+    llm = FakeLLM(fail_on="q1")
+    batcher = LLMBatcher(llm, window=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            *(batcher.submit(_request(f"q{i}")) for i in range(3)),
+            return_exceptions=True
+        )
+
+    first, second, third = asyncio.run(run())
+    assert first.content == "answer to q0"
+    assert isinstance(second, RuntimeError)
+    assert third.content == "answer to q2"
+
+
+def test_single_request_uses_ainvoke():
+    llm = FakeLLM()
+    batcher = LLMBatcher(llm, window=0.001)
+    reply = asyncio.run(batcher.submit(_request("solo")))
+    assert reply.content == "answer to solo"
+    assert batcher.stats() == {"requests": 1, "batches": 1, "avg_batch_size": 1.0}
+
+
+def test_short_batch_result_fails_the_unanswered_callers():
+    class ShortLLM(FakeLLM):
+        async def abatch(self, inputs, return_exceptions=False):
+            return (await super().abatch(inputs, return_exceptions))[:1]
+
+    batcher = LLMBatcher(ShortLLM(), window=0.01)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(_request(f"q{i}")) for i in range(3)), return_exceptions=True),
+            timeout=1.0
+        )
+
+    first, second, third = asyncio.run(run())
+    assert first.content == "answer to q0"
+    assert isinstance(second, RuntimeError)
+    assert isinstance(third, RuntimeError)
+
+
+def test_cancelled_dispatch_fails_pending_callers():
+    class HangingLLM(FakeLLM):
+        async def abatch(self, inputs, return_exceptions=False):
+            await asyncio.Event().wait()
+
+    batcher = LLMBatcher(HangingLLM(), window=0.001)
+
+    async def run():
+        callers = asyncio.gather(*(batcher.submit(_request(f"q{i}")) for i in range(2)), return_exceptions=True)
+        while not batcher._dispatches:
+            await asyncio.sleep(0.001)
+        for task in list(batcher._dispatches):
+            task.cancel()
+        return await asyncio.wait_for(callers, timeout=1.0)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_stats_report_enabled_before_the_first_request(monkeypatch):
+    monkeypatch.setenv("LLM_BATCH_WINDOW_MS", "10")
+    _batch_settings.cache_clear()
+    try:
+        assert batcher_stats()["enabled"] is True
+        monkeypatch.setenv("LLM_BATCH_WINDOW_MS", "0")
+        _batch_settings.cache_clear()
+        assert batcher_stats()["enabled"] is False
+    finally:
+        monkeypatch.undo()
+        _batch_settings.cache_clear()
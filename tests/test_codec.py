@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import codec
+from codec import JSON_CODEC, MsgpackCodec, dumps, negotiate_codec
+
+
+def test_encode_message_keeps_the_json_shape():
+    frame = JSON_CODEC.encode_message('say "hi"', "error")
+    assert json.loads(frame) == {"type": "error", "content": {"type": "text", "text": 'say "hi"'}}
+
+
+def test_dumps_escapes_lone_surrogates():
+    frame = JSON_CODEC.encode_message("broken \ud800 text")
+    frame.encode("utf-8")
+    assert json.loads(frame)["content"]["text"] == "broken \ud800 text"
+    assert json.loads(dumps({"n": 2 ** 70})) == {"n": 2 ** 70}
+
+
+@pytest.mark.parametrize("requested", [None, "", "json", "JSON"])
+def test_negotiate_defaults_to_json(requested):
+    assert negotiate_codec(requested) is JSON_CODEC
+
+
+def test_negotiate_refuses_unknown_codecs():
+    assert negotiate_codec("protobuf") is None
+
+
+def test_negotiate_refuses_msgpack_when_not_installed(monkeypatch):
+    monkeypatch.setattr(codec, "MSGPACK_CODEC", None)
+    assert negotiate_codec("msgpack") is None
+
+
+def test_negotiate_msgpack():
+    pytest.importorskip("msgpack")
+    negotiated = negotiate_codec("msgpack")
+    assert isinstance(negotiated, MsgpackCodec)
+    assert negotiated.binary
+
+
+def test_msgpack_round_trips_the_json_shape():
+    msgpack = pytest.importorskip("msgpack")
+    frame = MsgpackCodec().encode_message("hello", "error")
+    assert isinstance(frame, bytes)
+    assert msgpack.unpackb(frame) == {"type": "error", "content": {"type": "text", "text": "hello"}}
+    assert MsgpackCodec().decode(msgpack.packb({"type": "pong"})) == {"type": "pong"}
+
+
+def test_msgpack_decode_accepts_json_text():
+    pytest.importorskip("msgpack")
+    assert MsgpackCodec().decode('{"message": "hi"}') == {"message": "hi"}
@@ -0,0 +1,75 @@
+import pytest
+
+from base import OperatorResponse
+from command_cache import OperatorCommandCache
+
+HOST = "ws://desktop-1/ws"
+
+
+def _response(text="ok", status="success"):
+    return OperatorResponse(is_complete=True, messages=[text], final_result=text, status=status)
+
+
+@pytest.fixture
+def cache():
+    cache = OperatorCommandCache()
+    cache.put(HOST, "pip list | grep numpy", "package_check", _response("numpy 1.26.4"))
+    cache.put(HOST, "pip show pandas", "package_check", _response("pandas 2.0.0"))
+    cache.put(HOST, "pip list", "package_check", _response("everything"))
+    cache.put(HOST, "python --version", "version_check", _response("Python 3.11.2"))
+    cache.put("ws://desktop-2/ws", "pip list | grep numpy", "package_check", _response())
+    return cache
+
+
+def _cached(cache, host, command, command_type="package_check"):
+    return cache.get(host, command, command_type) is not None
+
+
+def test_lookup_normalizes_command(cache):
+    assert _cached(cache, HOST, "  PIP list |  grep NumPy ")
+    assert not _cached(cache, HOST, "pip list | grep scipy")
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_non_cacheable_and_failed_results_are_not_stored():
+    cache = OperatorCommandCache()
+    cache.put(HOST, "pip install numpy", "installation", _response())
+    cache.put(HOST, "pip list | grep numpy", "package_check", _response(status="error"))
+    assert cache.stats()["entries"] == 0
+
+
+def test_install_invalidates_affected_package_checks(cache):
+    cache.invalidate_for(HOST, "pip install numpy==1.26.4", "installation")
+    assert not _cached(cache, HOST, "pip list | grep numpy")
+    assert not _cached(cache, HOST, "pip list")
+    assert _cached(cache, HOST, "pip show pandas")
+    assert _cached(cache, HOST, "python --version", "version_check")
+    assert _cached(cache, "ws://desktop-2/ws", "pip list | grep numpy")
+
+
+@pytest.mark.parametrize("command", [
+    "pip install -r requirements.txt",
+    "pip install --requirement=requirements.txt",
+    "pip install -e .",
+    "pip install ./pkg",
+    "pip install git+https://example.com/pkg.git",
+    "pip install dist/pkg-1.0-py3-none-any.whl",
+])
+def test_indirect_install_invalidates_every_package_check(cache, command):
+    cache.invalidate_for(HOST, command, "installation")
+    assert not _cached(cache, HOST, "pip list | grep numpy")
+    assert not _cached(cache, HOST, "pip show pandas")
+    assert _cached(cache, HOST, "python --version", "version_check")
+
+
+def test_general_command_clears_host(cache):
+    cache.invalidate_for(HOST, "uninstall_python", "general")
+    assert not _cached(cache, HOST, "python --version", "version_check")
+    assert not _cached(cache, HOST, "pip show pandas")
+    assert _cached(cache, "ws://desktop-2/ws", "pip list | grep numpy")
+
+
+def test_read_only_command_does_not_invalidate(cache):
+    cache.invalidate_for(HOST, "pip list | grep numpy", "package_check")
+    assert cache.stats()["invalidations"] == 0
@@ -0,0 +1,131 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from base import ConversationContext, OperatorResponse
+from command_cache import OperatorCommandCache
+from fanout import FanoutSummary, HostResult, OperatorFanout
+from tools import OperatorAgentTool
+
+
+class FakeHosts:
+    """Stands in for the remote operator: per-host delay and output, or an exception"""
+
+    def __init__(self, delays=None, outputs=None, errors=None):
+        self.delays = delays or {}
+        self.outputs = outputs or {}
+        self.errors = errors or {}
+        self.running = 0
+        self.max_running = 0
+        self.cancelled = []
+
+    async def execute_remote(self, tool, command, command_type):
+        host = tool.ws_url
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(host, 0))
+            if host in self.errors:
+                raise self.errors[host]
+            output = self.outputs.get(host, "Python 3.11.2")
+            return OperatorResponse(is_complete=True, messages=[output], final_result=output)
+        except asyncio.CancelledError:
+            self.cancelled.append(host)
+            raise
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def hosts(monkeypatch):
+    fake = FakeHosts()
+
+    async def execute_remote(tool, command, command_type):
+        return await fake.execute_remote(tool, command, command_type)
+
+    monkeypatch.setattr(OperatorAgentTool, "_execute_remote", execute_remote)
+    return fake
+
+
+def _fanout(urls, **kwargs):
+    return OperatorFanout(urls, cache=OperatorCommandCache(), **kwargs)
+
+
+def test_concurrency_is_bounded(hosts):
+    urls = [f"ws://desktop-{i}/ws" for i in range(10)]
+    hosts.delays = {url: 0.01 for url in urls}
+    summary = asyncio.run(_fanout(urls, max_concurrency=3).run("python --version", ConversationContext()))
+    assert len(summary.results) == 10
+    assert hosts.max_running == 3
+
+
+def test_slow_host_times_out_without_holding_up_the_rest(hosts):
+    hosts.delays = {"ws://slow/ws": 1.0}
+    fanout = _fanout(["ws://slow/ws", "ws://fast/ws"], host_timeout=0.05)
+    summary = asyncio.run(fanout.run("python --version", ConversationContext()))
+    by_host = {result.host: result for result in summary.results}
+    assert by_host["ws://slow/ws"].status == "timeout"
+    assert by_host["ws://slow/ws"].final_result is None
+    assert by_host["ws://fast/ws"].status == "success"
+    assert summary.status_counts == {"success": 1, "timeout": 1}
+
+
+def test_errors_are_captured_per_host(hosts):
+    hosts.errors = {"ws://broken/ws": ConnectionRefusedError("refused")}
+    fanout = _fanout(["ws://broken/ws", "ws://ok/ws"])
+    summary = asyncio.run(fanout.run("python --version", ConversationContext()))
+    by_host = {result.host: result for result in summary.results}
+    assert by_host["ws://broken/ws"].status == "error"
+    assert "refused" in by_host["ws://broken/ws"].final_result
+    assert by_host["ws://ok/ws"].final_result == "Python 3.11.2"
+
+
+def test_results_stream_in_completion_order(hosts):
+    hosts.delays = {"ws://a/ws": 0.06, "ws://b/ws": 0.0, "ws://c/ws": 0.03}
+    seen = []
+
+    async def on_result(result):
+        seen.append(result.host)
+
+    fanout = _fanout(["ws://a/ws", "ws://b/ws", "ws://c/ws"])
+    asyncio.run(fanout.run("python --version", ConversationContext(), on_result=on_result))
+    assert seen == ["ws://b/ws", "ws://c/ws", "ws://a/ws"]
+
+
+def test_closing_the_stream_early_cancels_remaining_hosts(hosts):
+    hosts.delays = {"ws://fast/ws": 0.0, "ws://slow-1/ws": 1.0, "ws://slow-2/ws": 1.0}
+
+    async def scenario():
+        fanout = _fanout(["ws://fast/ws", "ws://slow-1/ws", "ws://slow-2/ws"])
+        async with aclosing(fanout.stream("python --version", ConversationContext())) as results:
+            async for result in results:
+                first = result
+                break
+        await asyncio.sleep(0)
+        return first
+
+    first = asyncio.run(scenario())
+    assert first.host == "ws://fast/ws"
+    assert sorted(hosts.cancelled) == ["ws://slow-1/ws", "ws://slow-2/ws"]
+
+
+def test_diagnostic_data_groups_identical_output_smallest_group_first():
+    summary = FanoutSummary(command="python --version", results=[
+        HostResult(host="ws://c/ws", status="success", final_result="Python 3.11.2"),
+        HostResult(host="ws://a/ws", status="success", final_result="Python 3.11.2"),
+        HostResult(host="ws://b/ws", status="success", final_result="Python 3.9.1"),
+        HostResult(host="ws://d/ws", status="timeout"),
+        HostResult(host="ws://e/ws", status="success", final_result="Python 3.11.2"),
+        HostResult(host="ws://f/ws", status="timeout"),
+    ])
+    data = summary.to_diagnostic_data()
+    assert data["issue_type"] == "fleet_scan"
+    fanout_summary = data["fanout_summary"]
+    assert fanout_summary["hosts"] == 6
+    assert fanout_summary["status_counts"] == {"success": 4, "timeout": 2}
+    assert fanout_summary["results"] == [
+        {"output": "Python 3.9.1", "count": 1, "hosts": ["ws://b/ws"]},
+        {"output": "<timeout>", "count": 2, "hosts": ["ws://d/ws", "ws://f/ws"]},
+        {"output": "Python 3.11.2", "count": 3, "hosts": ["ws://a/ws", "ws://c/ws", "ws://e/ws"]},
+    ]
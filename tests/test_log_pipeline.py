@@ -0,0 +1,83 @@
+import json
+import logging
+
+import pytest
+
+import log_pipeline
+from log_pipeline import EventSampler, JsonFormatter, configure_logging, log_event, shutdown_logging
+
+
+@pytest.fixture
+def pipeline(capsys):
+    # Tests call configure_logging themselves so the handler binds the captured stderr
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    yield capsys
+    shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in saved_handlers:
+        root.addHandler(handler)
+    root.setLevel(saved_level)
+    log_pipeline.sampler.rates = {}
+
+
+def _records(capsys):
+    return [json.loads(line) for line in capsys.readouterr().err.splitlines() if line]
+
+
+def test_records_are_written_as_json_after_flush(pipeline):
+    configure_logging(level="INFO", sample_rates={})
+    log_event(logging.getLogger("test"), logging.INFO, "message_sent", "Sending message", body="hello")
+    shutdown_logging()
+    [record] = _records(pipeline)
+    assert record["event"] == "message_sent"
+    assert record["body"] == "hello"
+
+
+def test_records_after_shutdown_are_not_lost(pipeline):
+    configure_logging(level="INFO", sample_rates={})
+    shutdown_logging()
+    logging.getLogger("test").warning("late warning")
+    [record] = _records(pipeline)
+    assert record["message"] == "late warning"
+    assert not any(isinstance(h, log_pipeline.QueueHandler) for h in logging.getLogger().handlers)
+
+
+def test_sampled_out_events_are_dropped(pipeline):
+    configure_logging(level="INFO", sample_rates={})
+    log_pipeline.sampler.rates = {"noisy": 0.0}
+    logger = logging.getLogger("test")
+    log_event(logger, logging.INFO, "noisy", "dropped")
+    log_event(logger, logging.WARNING, "noisy", "kept")
+    shutdown_logging()
+    assert [record["message"] for record in _records(pipeline)] == ["kept"]
+
+
+def test_log_event_accepts_reserved_field_names(pipeline):
+    configure_logging(level="INFO", sample_rates={})
+    log_event(logging.getLogger("test"), logging.INFO, "e", "m", level="x", event="y", message="z")
+    shutdown_logging()
+    [record] = _records(pipeline)
+    assert (record["level"], record["event"], record["message"]) == ("INFO", "e", "m")
+    assert (record["field_level"], record["field_event"], record["field_message"]) == ("x", "y", "z")
+
+
+def test_formatter_caps_field_length():
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "x" * 50, None, None)
+    record.fields = {"body": "y" * 50}
+    payload = json.loads(JsonFormatter(max_field_length=10).format(record))
+    assert payload["message"].startswith("x" * 10 + "...")
+    assert payload["body"] == "y" * 10 + "...[40 more chars]"
+
+
+def test_formatter_decodes_and_caps_bytes_fields():
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "received", None, None)
+    record.fields = {"body": b"\x82\xa4type" + b"z" * 50, "short": b"ok"}
+    payload = json.loads(JsonFormatter(max_field_length=10).format(record))
+    assert payload["body"] == "\ufffd\ufffdtypezzzz...[46 more bytes]"
+    assert payload["short"] == "ok"
+
+def test_sampler_from_env(monkeypatch):
+    monkeypatch.setenv("LOG_SAMPLE_RATES", "message_sent=0.25, message_received=0")
+    assert EventSampler.from_env().rates == {"message_sent": 0.25, "message_received": 0.0}
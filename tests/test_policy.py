@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from policy import CompliancePolicy, compile_specifier, get_policy, version_tuple
+
+
+def test_version_tuple_orders_numerically():
+    assert version_tuple("3.9.18") < version_tuple("3.10.0")
+    assert version_tuple("Python 3.11") == (3, 11, 0)
+
+
+@pytest.mark.parametrize("specifier, version, expected", [
+    (">=3.10", "3.9.18", False),
+    (">=3.10", "3.10.0", True),
+    (">=3.10,<4", "4.0.0", False),
+    ("==3.10.*", "3.10.7", True),
+    ("==3.10.*", "3.11.0", False),
+    ("!=3.10.*", "3.11.0", True),
+    ("~=3.10", "3.12.1", True),
+    ("~=3.10", "4.0.0", False),
+    ("~=3.10.2", "3.10.9", True),
+    ("~=3.10.2", "3.11.0", False),
+    ("", "1.0.0", True),
+    ("*", "1.0.0", True),
+])
+def test_compile_specifier(specifier, version, expected):
+    assert compile_specifier(specifier)(version_tuple(version)) is expected
+
+
+@pytest.mark.parametrize("specifier", ["==3.*.1", ">=3.*", "3..1", "~=3", "latest", 3.10])
+def test_compile_specifier_rejects_invalid(specifier):
+    with pytest.raises(ValueError):
+        compile_specifier(specifier)
+
+
+def test_policy_rejects_non_string_specifiers():
+    with pytest.raises(ValueError):
+        CompliancePolicy({"python": 3.10})
+    with pytest.raises(ValueError):
+        CompliancePolicy({"required_packages": ["numpy"]})
+
+
+def test_check_python():
+    policy = CompliancePolicy({"python": ">=3.10"})
+    assert policy.check_python("3.10.0")
+    assert not policy.check_python("3.9.1")
+    assert not policy.check_python("not a version")
+
+
+def test_evaluate_inventory():
+    policy = CompliancePolicy({
+        "python": ">=3.10",
+        "required_packages": {"NumPy": ">=1.21,<2"},
+        "forbidden_packages": {"tensorflow": "<2.0", "pycrypto": "*"},
+    })
+    result = policy.evaluate("3.9.0", {
+        "numpy": "1.20.0",
+        "tensorflow": "1.15.0",
+        "pycrypto": "2.6.1",
+        "pandas": "2.0.0",
+    })
+    assert not result.is_compliant
+    assert sorted((v.rule, v.subject) for v in result.violations) == [
+        ("forbidden", "pycrypto"),
+        ("forbidden", "tensorflow"),
+        ("python", "python"),
+        ("required", "numpy"),
+    ]
+
+    assert policy.evaluate("3.11.2", {"numpy": "1.26.4", "tensorflow": "2.15.0"}).is_compliant
+
+
+def test_evaluate_missing_required_only_for_complete_inventory():
+    policy = CompliancePolicy({"required_packages": {"numpy": "*"}})
+    assert policy.evaluate("3.11.0", {}).is_compliant
+    result = policy.evaluate("3.11.0", {}, complete_inventory=True)
+    assert result.messages == ["Required package numpy is not installed"]
+    assert not policy.evaluate("3.11.0", {"numpy": None}).is_compliant
+
+
+def test_get_policy_falls_back_on_invalid_file(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"python": 3.10}))
+    policy = get_policy(str(path))
+    assert policy.python_specifier == ">=3.10"
+
+
+def test_is_compliant_version_uses_the_loaded_policy():
+    from base import is_compliant_version
+
+    assert is_compliant_version("3.10.0")
+    assert not is_compliant_version("3.9.18")
+    assert not is_compliant_version("not a version")
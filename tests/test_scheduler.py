@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from scheduler import BackgroundScheduler, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+
+
+def _recorder(order, name):
+    async def job():
+        order.append(name)
+        return name
+    return job
+
+
+def test_jobs_run_by_priority_then_fifo():
+    async def scenario():
+        scheduler = BackgroundScheduler(max_workers=1)
+        order = []
+        futures = [
+            scheduler.submit("low", _recorder(order, "low"), PRIORITY_LOW),
+            scheduler.submit("normal-1", _recorder(order, "normal-1"), PRIORITY_NORMAL),
+            scheduler.submit("high", _recorder(order, "high"), PRIORITY_HIGH),
+            scheduler.submit("normal-2", _recorder(order, "normal-2"), PRIORITY_NORMAL),
+        ]
+        results = await asyncio.gather(*futures)
+        await scheduler.stop()
+        return order, results
+
+    order, results = asyncio.run(scenario())
+    assert order == ["high", "normal-1", "normal-2", "low"]
+    assert results == ["low", "normal-1", "high", "normal-2"]
+
+
+def test_pending_duplicates_share_one_job():
+    async def scenario():
+        scheduler = BackgroundScheduler(max_workers=1)
+        order = []
+        first = scheduler.submit("verify", _recorder(order, "first"))
+        second = scheduler.submit("verify", _recorder(order, "second"))
+        await first
+        # Once the job has run, the same key queues a fresh job
+        third = scheduler.submit("verify", _recorder(order, "third"))
+        await third
+        await scheduler.stop()
+        return first, second, order, scheduler.stats()
+
+    first, second, order, stats = asyncio.run(scenario())
+    assert first is second
+    assert order == ["first", "third"]
+    assert stats["deduplicated"] == 1
+    assert stats["completed"] == 2
+
+
+def test_failures_are_counted_and_surface_on_the_future():
+    async def scenario():
+        scheduler = BackgroundScheduler(max_workers=1)
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        failed = scheduler.submit("broken", broken)
+        ok = scheduler.submit("ok", _recorder([], "ok"))
+        assert await ok == "ok"
+        with pytest.raises(RuntimeError, match="boom"):
+            await failed
+        await scheduler.stop()
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["failed"] == 1
+    assert stats["completed"] == 1
+
+
+def test_stop_cancels_queued_jobs():
+    async def scenario():
+        scheduler = BackgroundScheduler(max_workers=1)
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        running = scheduler.submit("running", blocker)
+        queued = scheduler.submit("queued", _recorder([], "queued"))
+        await asyncio.sleep(0)
+        await scheduler.stop()
+        return running, queued, scheduler.stats()
+
+    running, queued, stats = asyncio.run(scenario())
+    assert running.cancelled()
+    assert queued.cancelled()
+    assert stats["workers"] == 0
+
+
+def test_cancel_drops_queued_and_running_jobs_by_prefix():
+    async def scenario():
+        scheduler = BackgroundScheduler(max_workers=1)
+        order = []
+        started = asyncio.Event()
+
+        async def blocker():
+            started.set()
+            await asyncio.Event().wait()
+
+        running = scheduler.submit("agent-1:install", blocker)
+        queued = scheduler.submit("agent-1:verify", _recorder(order, "agent-1"))
+        other = scheduler.submit("agent-2:verify", _recorder(order, "agent-2"))
+        await started.wait()
+        assert scheduler.cancel("agent-1:") == 2
+        # The worker survives the cancellation and moves on to the other session's job
+        assert await asyncio.wait_for(other, timeout=1.0) == "agent-2"
+        await scheduler.stop()
+        return running, queued, order, scheduler.stats()
+
+    running, queued, order, stats = asyncio.run(scenario())
+    assert running.cancelled() and queued.cancelled()
+    assert order == ["agent-2"]
+    assert stats["cancelled"] == 2
+    assert stats["completed"] == 1
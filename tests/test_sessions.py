@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+
+from base import ConversationContext
+from sessions import SessionManager
+
+
+class FakeWebSocket:
+    def __init__(self, fail_send=False):
+        self.fail_send = fail_send
+        self.sent = []
+        self.close_code = None
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+    async def send_text(self, frame):
+        if self.fail_send:
+            raise RuntimeError("send failed")
+        self.sent.append(frame)
+
+
+class FakeAgent:
+    def __init__(self):
+        self.context = ConversationContext()
+        self.jobs_cancelled = False
+
+    def cancel_background_jobs(self):
+        self.jobs_cancelled = True
+
+
+async def _connect(manager, websocket, **kwargs):
+    """Register from a dedicated task, like websocket_endpoint does"""
+    registered = asyncio.get_running_loop().create_future()
+
+    async def handler():
+        registered.set_result(await manager.register(websocket, FakeAgent(), **kwargs))
+        await asyncio.sleep(3600)
+
+    task = asyncio.create_task(handler())
+    return await registered, task
+
+
+def test_session_cap_evicts_least_recently_active(tmp_path):
+    async def run():
+        manager = SessionManager(max_sessions=2, spill_dir=str(tmp_path))
+        first, second, third = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        first_session, first_task = await _connect(manager, first)
+        first_session.agent.context.add_message("user", "hello")
+        second_session, _ = await _connect(manager, second)
+        manager.touch(first)
+        await _connect(manager, third)
+        await asyncio.sleep(0)
+        return manager, first, second, first_session, second_session
+
+    manager, first, second, first_session, second_session = asyncio.run(run())
+    assert first in manager and second not in manager
+    assert second.close_code == 1001
+    assert second_session.agent.jobs_cancelled and not first_session.agent.jobs_cancelled
+    assert manager.stats()["evictions"] == {"session_cap": 1}
+    [spilled] = os.listdir(tmp_path)
+    assert json.loads((tmp_path / spilled).read_text())["messages"] == []
+
+
+def test_spill_uses_a_snapshot_of_the_context(tmp_path):
+    async def run():
+        manager = SessionManager(spill_dir=str(tmp_path))
+        session, _ = await _connect(manager, FakeWebSocket())
+        session.agent.context.add_message("user", "before eviction")
+        eviction = asyncio.create_task(manager.evict(session, "idle"))
+        await asyncio.sleep(0)
+        session.agent.context.add_message("user", "after eviction")
+        await eviction
+        return session.session_id
+
+    session_id = asyncio.run(run())
+    snapshot = json.loads((tmp_path / f"{session_id}.json").read_text())
+    assert [message["content"] for message in snapshot["messages"]] == ["before eviction"]
+
+
+def test_pings_are_only_sent_to_opted_in_clients():
+    async def run():
+        manager = SessionManager()
+        legacy, opted_in = FakeWebSocket(), FakeWebSocket()
+        await _connect(manager, legacy)
+        await _connect(manager, opted_in, heartbeat=True)
+        await manager._heartbeat_once()
+        return legacy, opted_in
+
+    legacy, opted_in = asyncio.run(run())
+    assert legacy.sent == []
+    assert [json.loads(frame) for frame in opted_in.sent] == [{"type": "ping"}]
+
+
+def test_idle_and_silent_heartbeat_sessions_are_evicted():
+    async def run():
+        manager = SessionManager(idle_timeout=60.0, heartbeat_timeout=30.0)
+        idle, silent, failing, healthy = (FakeWebSocket() for _ in range(4))
+        idle_session, _ = await _connect(manager, idle)
+        silent_session, _ = await _connect(manager, silent, heartbeat=True)
+        await _connect(manager, failing, heartbeat=True)
+        await _connect(manager, healthy, heartbeat=True)
+        failing.fail_send = True
+        idle_session.last_active -= 61
+        silent_session.last_pong -= 31
+        await manager._heartbeat_once()
+        await asyncio.sleep(0)
+        return manager, healthy
+
+    manager, healthy = asyncio.run(run())
+    assert len(manager) == 1 and healthy in manager
+    assert manager.stats()["evictions"] == {"idle": 1, "heartbeat": 2}
+
+
+def test_enforce_memory_trims_oldest_history():
+    async def run():
+        manager = SessionManager(memory_budget_bytes=2000)
+        session, _ = await _connect(manager, FakeWebSocket())
+        for i in range(10):
+            session.agent.context.add_message("user", f"message {i}")
+        manager.enforce_memory(session)
+        return session.agent.context
+
+    context = asyncio.run(run())
+    assert context.approx_bytes <= 2000
+    assert context.messages[-1]["content"] == "message 9"
+    assert len(context.llm_messages) == len(context.messages)
@@ -1,25 +1,60 @@
 from typing import Callable, Awaitable, Dict, Any, List, Optional
-import websockets
 import json
 import logging
 import asyncio
 import re
-from base import OperatorResponse, AgentResponse, LLMHandler, ConversationContext, extract_package_version, parse_version
+from base import OperatorResponse, AgentResponse, LLMHandler, ConversationContext, PromptBuilder, extract_package_version, parse_version
+from policy import get_policy
+from command_cache import OperatorCommandCache, command_cache
+from log_pipeline import log_event
+from codec import JSON_CODEC, AGENT_PREFIXES
 
 logger = logging.getLogger(__name__)
 
+_PACKAGE_VERSION_PATTERN = re.compile(r'(\w+)\s+version:\s*([\d\.]+)', re.IGNORECASE)
+_INSTALLED_PACKAGE_PATTERN = re.compile(r'installed\s+(\w+)\s*(?:version\s*)?([\d\.]+)?')
+_OPERATOR_HEADER = AGENT_PREFIXES["Operator Agent"]
+_OPERATOR_TAG = _OPERATOR_HEADER.rstrip()
+
 class OperatorAgentTool:
-    def __init__(self, message_callback: Callable[[str], Awaitable[None]]):
-        self.ws_url = "ws://localhost:8501/ws"
+    def __init__(
+        self,
+        message_callback: Callable[[str], Awaitable[None]],
+        cache: Optional[OperatorCommandCache] = None,
+        ws_url: str = "ws://localhost:8501/ws"
+    ):
+        self.ws_url = ws_url
         self.message_callback = message_callback
+        self.cache = cache if cache is not None else command_cache
 
     async def execute(self, command: str, context: ConversationContext) -> OperatorResponse:
-        logger.info(f"Operator Agent executing command: {command}")
         command_type = self._determine_command_type(command)
-        
+
+        cached = self.cache.get(self.ws_url, command, command_type)
+        if cached is not None:
+            log_event(logger, logging.INFO, "operator_cache_hit", "Operator Agent cache hit", command=command)
+            for message in cached.messages:
+                await self.message_callback(message)
+            return cached
+
+        log_event(
+            logger, logging.INFO, "operator_command", "Operator Agent executing command",
+            command=command, command_type=command_type, host=self.ws_url
+        )
+        response = await self._execute_remote(command, command_type)
+
+        # Mutations invalidate after completion so reads racing the change are not kept
+        self.cache.invalidate_for(self.ws_url, command, command_type)
+        self.cache.put(self.ws_url, command, command_type, response)
+        return response
+
+    async def _execute_remote(self, command: str, command_type: str) -> OperatorResponse:
         try:
+            # Imported here so the chat server can start without loading the websocket client
+            import websockets
+
             async with websockets.connect(self.ws_url) as websocket:
-                await websocket.send(json.dumps({"message": command}))
+                await websocket.send(JSON_CODEC.encode({"message": command}))
                 
                 messages = []
                 response_received = False
@@ -30,7 +65,7 @@ class OperatorAgentTool:
                     try:
                         # Add timeout to websocket.recv()
                         response = await asyncio.wait_for(websocket.recv(), timeout=10.0)
-                        response_data = json.loads(response)
+                        response_data = JSON_CODEC.decode(response)
                         
                         if response_data["type"] == "message":
                             message = response_data['content'].get('text', '')
@@ -100,16 +135,18 @@ class OperatorAgentTool:
     def _determine_command_type(self, command: str) -> str:
         if "pip install" in command:
             return "installation"
-        elif "pip list" in command or "grep" in command:
+        elif "pip list" in command or "pip show" in command or "grep" in command:
             return "package_check"
         elif "python --version" in command:
             return "version_check"
         return "general"
 
     def _format_operator_message(self, message: str) -> str:
-        if not message.startswith("[Operator Agent]:"):
-            message = f"[Operator Agent]: {message}"
-        return message.replace("Operator Agent\n", "").strip()
+        if not message.startswith(_OPERATOR_TAG):
+            message = _OPERATOR_HEADER + message
+        if "Operator Agent\n" in message:
+            message = message.replace("Operator Agent\n", "")
+        return message.strip()
 
     def _update_context(self, context: ConversationContext, command_type: str, message: str):
         message_lower = message.lower()
@@ -121,13 +158,13 @@ class OperatorAgentTool:
                 # Handle package not found case
                 package_name = message.split(":")[-1].strip().lower().replace("is not installed", "").strip()
                 context.system_context.installed_packages[package_name] = None
-            elif match := re.search(r'(\w+)\s+version:\s*([\d\.]+)', message, re.IGNORECASE):
+            elif match := _PACKAGE_VERSION_PATTERN.search(message):
                 # Handle found package case
                 package_name, version = match.groups()
                 context.system_context.installed_packages[package_name.lower()] = version
         elif command_type == "installation" and any(x in message_lower for x in ["installed", "successfully"]):
             # Extract package and version information from installation message
-            if match := re.search(r'installed\s+(\w+)\s*(?:version\s*)?([\d\.]+)?', message_lower):
+            if match := _INSTALLED_PACKAGE_PATTERN.search(message_lower):
                 package_name, version = match.groups()
                 if version:
                     context.system_context.installed_packages[package_name] = version
@@ -164,7 +201,7 @@ class DiagnosticTool:
     def __init__(self, operator_tool: OperatorAgentTool, llm_handler: LLMHandler):
         self.operator_tool = operator_tool
         self.llm_handler = llm_handler
-        self.system_prompt = self.llm_handler.get_system_prompt("Diagnostic")
+        self.prompt_builder = PromptBuilder("Diagnostic", history_limit=0)
 
     async def analyze(self, context: str, conversation_context: ConversationContext) -> AgentResponse:
         if "install" in context.lower():
@@ -179,12 +216,11 @@ class DiagnosticTool:
                 data={"type": "compliance_check"}
             )
 
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": f"Analyze this issue and provide specific diagnostic steps: {context}"}
-        ]
+        messages = self.prompt_builder.build(
+            f"Analyze this issue and provide specific diagnostic steps: {context}"
+        )
         
-        response = self.llm_handler.invoke(messages, "Diagnostic Agent")
+        response = await self.llm_handler.ainvoke(messages, "Diagnostic Agent")
         return AgentResponse(
             message=response,
             next_action="analyze_issue",
@@ -226,7 +262,7 @@ class DiagnosticTool:
 class TroubleshootingTool:
     def __init__(self, llm_handler: LLMHandler):
         self.llm_handler = llm_handler
-        self.system_prompt = self.llm_handler.get_system_prompt("Troubleshooting")
+        self.prompt_builder = PromptBuilder("Troubleshooting", history_limit=0)
 
     async def analyze(self, diagnostic_data: Dict[str, Any], conversation_context: ConversationContext) -> AgentResponse:
         if "package" in diagnostic_data:
@@ -234,19 +270,36 @@ class TroubleshootingTool:
         
         if "python_version" in diagnostic_data:
             return self._analyze_python_version(diagnostic_data["python_version"])
+
+        if "fanout_summary" in diagnostic_data:
+            return await self._analyze_fanout(diagnostic_data["fanout_summary"])
         
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": f"Analyze this diagnostic data and provide resolution steps: {json.dumps(diagnostic_data)}"}
-        ]
+        messages = self.prompt_builder.build(
+            f"Analyze this diagnostic data and provide resolution steps: {json.dumps(diagnostic_data)}"
+        )
         
-        response = self.llm_handler.invoke(messages, "Troubleshooting Agent")
+        response = await self.llm_handler.ainvoke(messages, "Troubleshooting Agent")
         return AgentResponse(
             message=response,
             next_action="analyze_further",
             data={"status": "needs_investigation"}
         )
 
+    async def _analyze_fanout(self, summary: Dict[str, Any]) -> AgentResponse:
+        # One LLM call for the whole pool; hosts with identical output are already grouped
+        messages = self.prompt_builder.build(
+            f"The command '{summary['command']}' was run on {summary['hosts']} desktops. "
+            f"Results grouped by identical output: {json.dumps(summary['results'])}. "
+            "Identify the hosts that deviate from the pool and provide resolution steps."
+        )
+
+        response = await self.llm_handler.ainvoke(messages, "Troubleshooting Agent")
+        return AgentResponse(
+            message=response,
+            next_action="analyze_further",
+            data={"status": "fleet_analyzed", "status_counts": summary["status_counts"]}
+        )
+
     def _analyze_package_operation(self, data: Dict[str, Any], context: ConversationContext) -> AgentResponse:
         package_name = data["package"]
         if "action" in data and data["action"] == "install":
@@ -268,14 +321,16 @@ class TroubleshootingTool:
         )
 
     def _analyze_python_version(self, version: str) -> AgentResponse:
-        if parse_version(version) >= "3.10":
+        policy = get_policy()
+        requirement = policy.python_specifier
+        if policy.check_python(parse_version(version)):
             return AgentResponse(
-                message=f"[Troubleshooting Agent]: Python {version} meets minimum requirement of 3.10. No remediation needed.",
+                message=f"[Troubleshooting Agent]: Python {version} meets requirement {requirement}. No remediation needed.",
                 next_action="proceed",
                 data={"status": "compliant"}
             )
         return AgentResponse(
-            message=f"[Troubleshooting Agent]: Python {version} does not meet minimum requirement of 3.10. Remediation required.",
+            message=f"[Troubleshooting Agent]: Python {version} does not meet requirement {requirement}. Remediation required.",
                 next_action="uninstall_python",
                 data={"status": "non_compliant"}
             )
\ No newline at end of file